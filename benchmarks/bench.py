@@ -0,0 +1,316 @@
+"""
+Reproducible benchmarks for the diagnosis, lab and report hot paths.
+
+Every input is synthetic and drawn from a fixed seed: disease catalogues of
+13 to 50,000 entries (the real knowledge base first, then generated
+profiles), queries of 1 to 40 symptoms, batches of 1 to 100,000 encounters,
+and medication formularies of 10 to 20,000 drugs searched as typed and
+checked for interactions against medication lists of 5 to 50 drugs. Each case reports latency percentiles, throughput and the
+tracemalloc peak of one extra, separately traced call.
+
+Usage:
+    python benchmarks/bench.py [--quick] [--only diagnosis,batch,labs,report,medsearch,interactions]
+                               [--save baseline.json] [--compare baseline.json]
+                               [--threshold 0.25]
+
+With --compare, exits non-zero when any case's p50 latency or peak memory
+is more than --threshold above the baseline. Baselines are per machine.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import (InteractionIndex, MedicalDatabase, MedicationIndex, SymptomMatrix, diagnosis_report,  # noqa: E402
+                    get_top_diagnoses, get_top_diagnoses_batch, interpret_lab_frame, interpret_labs, report_text)
+
+SEED = 20240601
+CATALOGUE_SIZES = (13, 1_000, 10_000, 50_000)
+SYMPTOM_COUNTS = (1, 5, 10, 20, 40)
+# (catalogue size, encounters per batch); the product bounds the scored cells
+BATCH_CASES = ((13, 1), (13, 100), (13, 10_000), (13, 100_000),
+               (1_000, 1), (1_000, 100), (1_000, 10_000), (1_000, 100_000),
+               (50_000, 1), (50_000, 100), (50_000, 1_000))
+QUICK_CATALOGUE_SIZES = (13, 1_000)
+QUICK_SYMPTOM_COUNTS = (1, 5, 20)
+QUICK_BATCH_CASES = ((13, 100), (13, 10_000), (1_000, 1_000))
+FORMULARY_SIZES = (10, 1_000, 20_000)
+MEDICATION_RESULTS = 100   # rows the Medications page lists
+MEDICATION_LIST_SIZES = (5, 20, 50)
+QUICK_FORMULARY_SIZES = (10, 20_000)
+
+EXTRA_SYMPTOMS = 300
+AGES = (4, 25, 40, 58, 72, 85)
+GENDERS = ("Male", "Female", "Other")
+TEMPERATURES = (97.8, 98.6, 100.2, 101.5, 103.8)
+SEVERITIES = ("Mild", "Moderate", "Severe", "Critical")
+ONSETS = ("Sudden (minutes-hours)", "Gradual (days)", "Gradual (weeks)", "Intermittent")
+DURATIONS = ("< 24 hours", "1-3 days", "3-7 days", "1-2 weeks", "2-4 weeks", "> 1 month")
+
+# (low, high) sampling range per interpret_labs argument, wide enough to hit every branch
+LAB_RANGES = {
+    "wbc": (2.0, 16.0), "hemoglobin": (8.0, 18.0), "platelets": (80, 520), "mcv": (70.0, 110.0),
+    "glucose": (55, 180), "creatinine": (0.5, 2.5), "potassium": (2.8, 6.2), "sodium": (128, 152),
+    "calcium": (7.8, 11.5), "ldl": (60, 200), "triglycerides": (80, 600), "hdl": (25, 80),
+    "tsh": (0.1, 8.0), "t4_free": (0.5, 2.4),
+}
+
+
+# ==================== SYNTHETIC INPUTS ====================
+
+def symptom_pool() -> List[str]:
+    names = sorted(set().union(*(d["symptom_set"] for d in MedicalDatabase.DISEASES.values())))
+    return names + [f"Synthetic Symptom {i}" for i in range(EXTRA_SYMPTOMS)]
+
+
+def synthetic_catalogue(size: int, pool: Sequence[str], seed: int = SEED) -> Dict[str, Dict]:
+    """The real knowledge base followed by generated profiles, `size` diseases in total."""
+    rng = random.Random(seed + size)
+    catalogue: Dict[str, Dict] = dict(list(MedicalDatabase.DISEASES.items())[:size])
+    for i in range(size - len(catalogue)):
+        catalogue[f"Synthetic Disease {i}"] = {
+            "severity": rng.choice(("Mild", "Moderate", "Severe", "Critical — EMERGENCY")),
+            "symptom_set": frozenset(rng.sample(pool, rng.randint(3, 14))),
+        }
+    return catalogue
+
+
+def synthetic_encounters(count: int, pool: Sequence[str], symptoms: Optional[int] = None,
+                         seed: int = SEED) -> List[tuple]:
+    """(symptoms, age, gender, temperature, severity, onset, duration) tuples."""
+    rng = random.Random(seed + count + (symptoms or 0))
+    return [(rng.sample(pool, symptoms or rng.randint(1, 12)), rng.choice(AGES), rng.choice(GENDERS),
+             rng.choice(TEMPERATURES), rng.choice(SEVERITIES), rng.choice(ONSETS), rng.choice(DURATIONS))
+            for _ in range(count)]
+
+
+def synthetic_formulary(size: int, seed: int = SEED) -> Dict[str, Dict]:
+    """
+    The real medications followed by generated ones sharing their categories,
+    indications and interaction texts, plus two interactions with earlier drugs.
+    """
+    rng = random.Random(seed + size)
+    formulary: Dict[str, Dict] = dict(list(MedicalDatabase.MEDICATIONS.items())[:size])
+    real = list(formulary.values())
+    syllables = ("ab", "cor", "dex", "fen", "gli", "lo", "mab", "nex", "pra", "quin", "ril", "sar", "tan", "vo", "zol")
+    while len(formulary) < size:
+        name = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))).title()
+        if name in formulary:
+            name += f" {len(formulary)}"
+        like = rng.choice(real)
+        formulary[name] = {
+            "generic": f"{name} {rng.choice(('Hydrochloride', 'Sodium', 'Calcium', 'Besylate'))}",
+            "brand_names": ["".join(rng.choice(syllables) for _ in range(3)).title() for _ in range(rng.randint(1, 3))],
+            "category": like["category"], "mechanism": like["mechanism"],
+            "indications": rng.sample(like["indications"], rng.randint(1, len(like["indications"]))),
+            "interactions": like["interactions"] + [f"{other} — synthetic interaction"
+                                                    for other in rng.sample(list(formulary), 2)],
+            "contraindications": like["contraindications"],
+        }
+    return formulary
+
+
+def typed_queries(index: MedicationIndex, count: int, seed: int = SEED) -> List[str]:
+    """Prefixes of names, brands and indication words as typed, some with a swapped letter pair."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        word = rng.choice(index.terms)
+        typed = word[:rng.randint(1, len(word))]
+        if len(typed) > 4 and rng.random() < 0.3:
+            i = rng.randrange(1, len(typed) - 1)
+            typed = typed[:i] + typed[i + 1] + typed[i] + typed[i + 2:]
+        queries.append(typed)
+    return queries
+
+
+def synthetic_panels(count: int, seed: int = SEED) -> List[Dict[str, float]]:
+    rng = random.Random(seed)
+    return [{name: round(rng.uniform(low, high), 1) for name, (low, high) in LAB_RANGES.items()}
+            for _ in range(count)]
+
+
+# ==================== MEASUREMENT ====================
+
+def peak_kib(call: Callable[[], object]) -> float:
+    tracemalloc.start()
+    try:
+        call()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def measure(calls: Sequence[Callable[[], object]], items_per_call: int = 1, warmup: int = 5) -> Dict[str, float]:
+    """Time each call once (after `warmup` untimed calls); percentiles are per call."""
+    for call in calls[:warmup]:
+        call()
+    durations = np.empty(len(calls))
+    for i, call in enumerate(calls):
+        start = time.perf_counter_ns()
+        call()
+        durations[i] = time.perf_counter_ns() - start
+    total_s = durations.sum() / 1e9
+    p50, p90, p99 = np.percentile(durations / 1e3, [50, 90, 99])
+    return {"calls": len(calls), "p50_us": round(p50, 2), "p90_us": round(p90, 2), "p99_us": round(p99, 2),
+            "throughput_per_s": round(len(calls) * items_per_call / total_s, 1),
+            "peak_kib": round(peak_kib(calls[0]), 1)}
+
+
+def bench_diagnosis(quick: bool, pool: Sequence[str]) -> Dict[str, Dict]:
+    results = {}
+    for size in QUICK_CATALOGUE_SIZES if quick else CATALOGUE_SIZES:
+        compiled = SymptomMatrix.compile(synthetic_catalogue(size, pool))
+        for symptoms in QUICK_SYMPTOM_COUNTS if quick else SYMPTOM_COUNTS:
+            encounters = synthetic_encounters(200 if quick else 1000, pool, symptoms)
+            calls = [lambda e=e: get_top_diagnoses(*e, compiled=compiled) for e in encounters]
+            results[f"diagnosis/catalogue={size}/symptoms={symptoms}"] = measure(calls)
+    return results
+
+
+def bench_batch(quick: bool, pool: Sequence[str]) -> Dict[str, Dict]:
+    results = {}
+    compiled_by_size: Dict[int, SymptomMatrix] = {}
+    for size, count in QUICK_BATCH_CASES if quick else BATCH_CASES:
+        if size not in compiled_by_size:
+            compiled_by_size[size] = SymptomMatrix.compile(synthetic_catalogue(size, pool))
+        compiled = compiled_by_size[size]
+        columns = [list(c) for c in zip(*synthetic_encounters(count, pool))]
+        repeats = max(3, min(50, 20_000 // count))
+
+        def call(columns=columns, compiled=compiled):
+            return get_top_diagnoses_batch(*columns, compiled=compiled)
+
+        results[f"batch/catalogue={size}/encounters={count}"] = measure(
+            [call] * repeats, items_per_call=count, warmup=1)
+    return results
+
+
+def bench_labs(quick: bool) -> Dict[str, Dict]:
+    panels = synthetic_panels(2_000 if quick else 20_000)
+    results = {"labs/interpret_labs": measure([lambda p=p: interpret_labs(**p) for p in panels])}
+    for count in (1_000, 10_000) if quick else (1_000, 10_000, 100_000):
+        frame = pd.DataFrame(synthetic_panels(count))
+        results[f"labs/interpret_lab_frame/panels={count}"] = measure(
+            [lambda frame=frame: interpret_lab_frame(frame)] * 5, items_per_call=count, warmup=1)
+    return results
+
+
+def bench_report(quick: bool, pool: Sequence[str]) -> Dict[str, Dict]:
+    compiled = SymptomMatrix.compile(synthetic_catalogue(13, pool))
+    runs = []
+    for e in synthetic_encounters(200 if quick else 2_000, pool[:60]):
+        top_results = get_top_diagnoses(*e, compiled=compiled)
+        runs.append((e, top_results))
+    fixed = datetime(2024, 6, 1, 12, 0, 0)
+
+    def build(e, top_results):
+        symptoms, age, gender, temperature, severity, onset, duration = e
+        report = diagnosis_report(symptoms, top_results, age, gender, "No", severity, duration, onset,
+                                  temperature, 5, {"diabetes": False}, now=fixed)
+        return json.dumps(report, indent=2), report_text(report)
+
+    return {"report/json+txt": measure([lambda r=r: build(*r) for r in runs])}
+
+
+def bench_medsearch(quick: bool) -> Dict[str, Dict]:
+    results = {}
+    for size in QUICK_FORMULARY_SIZES if quick else FORMULARY_SIZES:
+        index = MedicationIndex(synthetic_formulary(size))
+        queries = typed_queries(index, 500 if quick else 2_000)
+        results[f"medsearch/formulary={size}"] = measure(
+            [lambda q=q: index.search(q, limit=MEDICATION_RESULTS) for q in queries])
+    return results
+
+
+def bench_interactions(quick: bool) -> Dict[str, Dict]:
+    results = {}
+    formulary = synthetic_formulary(20_000)
+    index = InteractionIndex(formulary, MedicationIndex(formulary))
+    names = list(formulary)
+    rng = random.Random(SEED)
+    for taking in MEDICATION_LIST_SIZES:
+        cases = [(rng.choice(names), rng.sample(names, taking)) for _ in range(500 if quick else 2_000)]
+        results[f"interactions/formulary=20000/taking={taking}"] = measure(
+            [lambda d=d, t=t: index.check(d, t) for d, t in cases])
+    return results
+
+
+# ==================== BASELINES ====================
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """Cases whose p50 latency or peak memory grew past the threshold (small absolute slack for tiny cases)."""
+    regressions = []
+    for case, now in results.items():
+        base = baseline.get(case)
+        if base is None:
+            continue
+        if now["p50_us"] > base["p50_us"] * (1 + threshold) + 2.0:
+            regressions.append(f"{case}: p50 {base['p50_us']:.1f} -> {now['p50_us']:.1f} us")
+        if now["peak_kib"] > base["peak_kib"] * (1 + threshold) + 16.0:
+            regressions.append(f"{case}: peak {base['peak_kib']:.1f} -> {now['peak_kib']:.1f} KiB")
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the diagnosis, lab and report hot paths.")
+    parser.add_argument("--quick", action="store_true", help="small grid for a fast check")
+    parser.add_argument("--only", default="diagnosis,batch,labs,report,medsearch,interactions",
+                        help="comma-separated suites (default: all)")
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to check against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative regression (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    pool = symptom_pool()
+    suites = {
+        "diagnosis": lambda: bench_diagnosis(args.quick, pool),
+        "batch": lambda: bench_batch(args.quick, pool),
+        "labs": lambda: bench_labs(args.quick),
+        "report": lambda: bench_report(args.quick, pool),
+        "medsearch": lambda: bench_medsearch(args.quick),
+        "interactions": lambda: bench_interactions(args.quick),
+    }
+    results: Dict[str, Dict] = {}
+    print(f"{'case':<48} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10} {'items/s':>12} {'peak KiB':>10}")
+    for name in args.only.split(","):
+        for case, r in suites[name.strip()]().items():
+            results[case] = r
+            print(f"{case:<48} {r['p50_us']:>10.1f} {r['p90_us']:>10.1f} {r['p99_us']:>10.1f} "
+                  f"{r['throughput_per_s']:>12.1f} {r['peak_kib']:>10.1f}")
+
+    if args.save:
+        meta = {"seed": SEED, "quick": args.quick, "python": platform.python_version(),
+                "numpy": np.__version__, "machine": platform.machine()}
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump({"meta": meta, "results": results}, fh, indent=2)
+            fh.write("\n")
+        print(f"saved {len(results)} cases to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"no regressions past {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
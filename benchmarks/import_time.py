@@ -0,0 +1,66 @@
+"""
+Measure how long the headless engine takes to import in a fresh interpreter,
+and check that it never pulls in the UI stack.
+
+Usage:
+    python benchmarks/import_time.py [--runs 5]
+
+Exits non-zero when a module's median import time exceeds its cap or when
+importing it loads streamlit or plotly.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional, Sequence
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module -> median import-time cap in ms (engine.batch and the ingest modules also load pandas)
+IMPORT_CAPS_MS = {"engine": 300.0, "engine.batch": 1500.0, "engine.lab_ingest": 1500.0,
+                  "engine.wearable_ingest": 1500.0}
+FORBIDDEN = ("streamlit", "plotly")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+ms = (time.perf_counter() - start) * 1000
+print(json.dumps({"ms": ms, "loaded": sorted({m.split(".")[0] for m in sys.modules})}))
+"""
+
+
+def measure(module: str) -> Dict:
+    """Import `module` in a new interpreter; return its import time and top-level packages loaded."""
+    out = subprocess.run([sys.executable, "-c", _PROBE, module], cwd=REPO_ROOT,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check engine import time and headlessness.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module (default: 5)")
+    args = parser.parse_args(argv)
+
+    failures: List[str] = []
+    for module, cap in IMPORT_CAPS_MS.items():
+        runs = [measure(module) for _ in range(args.runs)]
+        median = statistics.median(run["ms"] for run in runs)
+        forbidden = sorted(set(FORBIDDEN) & set(runs[0]["loaded"]))
+        third_party = [m for m in ("numpy", "pandas") if m in runs[0]["loaded"]]
+        print(f"{module:<22} median {median:7.1f} ms  (cap {cap:.0f} ms)  loads: {', '.join(third_party) or '-'}")
+        if median > cap:
+            failures.append(f"{module}: median import {median:.1f} ms exceeds {cap:.0f} ms")
+        if forbidden:
+            failures.append(f"{module}: imports {', '.join(forbidden)}")
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
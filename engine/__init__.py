@@ -0,0 +1,64 @@
+"""Diagnosis engine for MediCare AI Pro: knowledge base, symptom vocabulary and scoring."""
+
+from .cache import DiagnosisCache
+from .catalog import Catalog, load_catalog
+from .interactions import InteractionIndex
+from .knowledge_base import KnowledgeBase, LazyRecord, MedicalDatabase, kb_fingerprint, knowledge_base
+from .lab_history import LabHistory
+from .labs import LabRuleTable, interpret_lab_frame, interpret_labs, lab_rules, load_lab_rules
+from .medication_search import MedicationIndex
+from .modifiers import PMH_FIELDS, ModifierTable, load_rules
+from .patient_store import PatientStore
+from .record_export import EXPORT_FORMATS, available_export_formats, export_bytes, write_export
+from .records import diagnosis_record, diagnosis_report, report_text
+from .rolling_stats import Moments, WindowStats
+from .scoring import (SymptomMatrix, compute_jaccard_similarity, get_top_diagnoses,
+                      get_top_diagnoses_batch, symptom_matrix)
+from .timeseries import TimeSeriesStore, downsample
+from .timing import DIAGNOSIS_STAGES, StageTimer
+from .treatments import treatment_index
+from .vocabulary import SYMPTOM_CATEGORIES, SymptomVocabulary, build_vocabulary
+
+__all__ = [
+    "Catalog",
+    "DIAGNOSIS_STAGES",
+    "EXPORT_FORMATS",
+    "InteractionIndex",
+    "KnowledgeBase",
+    "LabHistory",
+    "LabRuleTable",
+    "LazyRecord",
+    "MedicalDatabase",
+    "MedicationIndex",
+    "ModifierTable",
+    "Moments",
+    "PMH_FIELDS",
+    "PatientStore",
+    "SYMPTOM_CATEGORIES",
+    "StageTimer",
+    "SymptomMatrix",
+    "SymptomVocabulary",
+    "TimeSeriesStore",
+    "WindowStats",
+    "available_export_formats",
+    "build_vocabulary",
+    "compute_jaccard_similarity",
+    "diagnosis_record",
+    "diagnosis_report",
+    "downsample",
+    "export_bytes",
+    "get_top_diagnoses",
+    "get_top_diagnoses_batch",
+    "interpret_lab_frame",
+    "interpret_labs",
+    "kb_fingerprint",
+    "knowledge_base",
+    "lab_rules",
+    "load_catalog",
+    "load_lab_rules",
+    "load_rules",
+    "report_text",
+    "symptom_matrix",
+    "treatment_index",
+    "write_export",
+]
@@ -0,0 +1,151 @@
+"""
+Headless batch triage: score a table of encounters and write the top-N
+differentials as CSV or JSON records.
+
+Usage:
+    python -m engine.batch encounters.csv -o results.json --top-n 3
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from .modifiers import PMH_FIELDS
+from .records import diagnosis_record
+from .scoring import get_top_diagnoses_batch
+
+# Symptom Analyzer widget defaults, used when an encounter column is absent or blank
+ENCOUNTER_DEFAULTS = {
+    "age": 35, "gender": "Male", "temperature": 98.6, "severity": "Moderate",
+    "onset": "Sudden (minutes-hours)", "duration": "< 24 hours", "pain_scale": 0,
+}
+
+
+def parse_symptoms(value) -> List[str]:
+    """Split a "Fever, Cough; Fatigue" cell (or pass a list through) into unique symptom names."""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        names = [str(v).strip() for v in value]
+    elif isinstance(value, str):
+        names = [v.strip() for v in value.replace(";", ",").split(",")]
+    else:
+        names = []
+    return list(dict.fromkeys(name for name in names if name))
+
+
+_TRUE_FLAGS = {"true", "yes", "y", "1"}
+_FALSE_FLAGS = {"false", "no", "n", "0", ""}
+
+
+def parse_flag(value) -> bool:
+    """
+    Read a history-flag cell: true/yes/y/1 or false/no/n/0/blank, in any case.
+    Raises ValueError for anything else.
+    """
+    if isinstance(value, bool):
+        return value
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return False
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in _TRUE_FLAGS:
+        return True
+    if text in _FALSE_FLAGS:
+        return False
+    raise ValueError(f"unrecognised flag {value!r}; expected true/false, yes/no or 1/0")
+
+
+def load_encounters(path: str) -> pd.DataFrame:
+    """Read encounters from CSV (or JSON records when the path ends in .json)."""
+    if path.lower().endswith(".json"):
+        return pd.read_json(path)
+    return pd.read_csv(path)
+
+
+def score_encounters(encounters: pd.DataFrame, top_n: int = 3) -> List[Dict]:
+    """
+    Score every encounter in one batch and return one record per row, with the
+    same fields the Symptom Analyzer saves to the medical history.
+    """
+    if "symptoms" not in encounters.columns:
+        raise ValueError("encounters need a 'symptoms' column")
+    frame = encounters.reset_index(drop=True)
+    columns = {}
+    for name, default in ENCOUNTER_DEFAULTS.items():
+        column = frame[name] if name in frame.columns else pd.Series(default, index=frame.index)
+        values = column.where(column.notna(), default).tolist()
+        if isinstance(default, int):
+            # CSV readers widen integer columns with blanks to float
+            values = [int(v) if isinstance(v, float) and v.is_integer() else v for v in values]
+        columns[name] = values
+
+    # Optional past-medical-history flags, one pmh_<field> column each (blank = no)
+    pmh = {}
+    for field in PMH_FIELDS:
+        column = f"pmh_{field}"
+        if column in frame.columns:
+            try:
+                pmh[field] = [parse_flag(value) for value in frame[column].tolist()]
+            except ValueError as exc:
+                raise ValueError(f"{column}: {exc}") from None
+
+    symptoms = [parse_symptoms(value) for value in frame["symptoms"]]
+    differentials = get_top_diagnoses_batch(
+        symptoms, columns["age"], columns["gender"], columns["temperature"],
+        columns["severity"], columns["onset"], columns["duration"], top_n=top_n, pmh=pmh)
+
+    run_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    dates = frame["date"].tolist() if "date" in frame.columns else [run_date] * len(frame)
+    ids = frame["encounter_id"].tolist() if "encounter_id" in frame.columns else None
+
+    records = []
+    for i, top_results in enumerate(differentials):
+        record = diagnosis_record(
+            symptoms[i], top_results, columns["severity"][i], columns["duration"][i],
+            columns["onset"][i], columns["age"][i], columns["gender"][i],
+            columns["temperature"][i], columns["pain_scale"][i], date=dates[i])
+        if ids is not None:
+            record = {"encounter_id": ids[i], **record}
+        records.append(record)
+    return records
+
+
+def write_results(records: List[Dict], path: Optional[str], fmt: str = "json") -> None:
+    """Write records as JSON (list of objects) or CSV (top_3 joined with '; ') to a path or stdout."""
+    out = open(path, "w", encoding="utf-8", newline="") if path else sys.stdout
+    try:
+        if fmt == "csv":
+            frame = pd.DataFrame(records)
+            if "top_3" in frame.columns:
+                frame["top_3"] = frame["top_3"].map("; ".join)
+            frame.to_csv(out, index=False)
+        else:
+            json.dump(records, out, indent=2, default=str)
+            out.write("\n")
+    finally:
+        if path:
+            out.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m engine.batch", description="Score a file of encounters with the Jaccard diagnosis engine.")
+    parser.add_argument("input", help="encounters CSV (or .json records)")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--top-n", type=int, default=3, help="differentials per encounter (default: 3)")
+    parser.add_argument("--format", choices=["json", "csv"],
+                        help="output format (default: from the output suffix, else json)")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.output and args.output.lower().endswith(".csv") else "json")
+    records = score_encounters(load_encounters(args.input), top_n=args.top_n)
+    write_results(records, args.output, fmt)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
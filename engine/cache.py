@@ -0,0 +1,103 @@
+"""
+Memoized diagnosis results: an in-memory LRU with an optional SQLite tier that
+survives restarts.
+"""
+
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# (disease rows, scores, confidences, jaccards, matched counts, modifiers) of one ranked result
+CachedResult = Tuple[List[int], List[float], List[int], List[float], List[int], List[float]]
+
+
+def result_key(signature: str, ids: np.ndarray, unknown: int, fired: np.ndarray, top_n: int) -> str:
+    """
+    Normalized request signature. Age, temperature, severity, onset, duration,
+    gender and history only reach the score through the modifier rules they
+    fire, so the fired-rule bits are their exact banding; the symptom bitmask
+    and the count of unknown symptoms fix the Jaccard terms.
+    """
+    mask = 0
+    for i in ids.tolist():
+        mask |= 1 << i
+    return f"{signature[:16]}:{top_n}:{mask:x}:{unknown}:{np.packbits(fired).tobytes().hex()}"
+
+
+class DiagnosisCache:
+    """
+    LRU of up to `max_entries` results in memory. With a `path`, misses fall
+    through to an SQLite table and every new result is written there too.
+    Safe to share between Streamlit sessions.
+    """
+
+    def __init__(self, max_entries: int = 4096, path: Optional[str] = None, max_disk_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.path = path
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.disk_hits = self.misses = 0
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS diagnoses (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM diagnoses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = tuple(json.loads(row[0]))
+                    self._remember(key, value)
+                    self.disk_hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: CachedResult) -> None:
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                cur = self._db.execute("INSERT OR REPLACE INTO diagnoses (key, value) VALUES (?, ?)",
+                                       (key, json.dumps(value)))
+                if cur.lastrowid > self.max_disk_entries:
+                    # Keep roughly the newest max_disk_entries rows
+                    self._db.execute("DELETE FROM diagnoses WHERE rowid <= ?",
+                                     (cur.lastrowid - self.max_disk_entries,))
+                self._db.commit()
+
+    def _remember(self, key: str, value: CachedResult) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                    "entries": len(self._entries), "max_entries": self.max_entries}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM diagnoses")
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
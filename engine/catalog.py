@@ -0,0 +1,53 @@
+"""
+One knowledge-base snapshot together with everything the app derives from it,
+built once and then shared read-only.
+"""
+
+from typing import Dict, List
+
+from .interactions import InteractionIndex
+from .knowledge_base import DEFAULT_KB_DIR, KnowledgeBase, LazyRecord
+from .medication_search import MedicationIndex
+from .scoring import SymptomMatrix, get_top_diagnoses
+from .treatments import TreatmentLine, treatment_index
+from .vocabulary import SYMPTOM_CATEGORIES
+
+
+class Catalog:
+    """
+    Knowledge base plus its compiled symptom matrix, medication search,
+    interaction and treatment indexes, and the lists the pages display.
+    """
+
+    def __init__(self, kb: KnowledgeBase):
+        self.kb = kb
+        self.diseases: Dict[str, LazyRecord] = kb.diseases
+        self.medications: Dict[str, LazyRecord] = kb.medications
+        self.symptom_matrix = SymptomMatrix.compile(kb.diseases)
+        self.symptom_categories: Dict[str, List[str]] = SYMPTOM_CATEGORIES
+        # Built from full records read once here; the lazy records stay unloaded
+        medications = kb.scan("medications")
+        self.medication_index = MedicationIndex(medications)
+        self.interactions = InteractionIndex(medications, self.medication_index)
+        self.treatment_medications: Dict[str, List[TreatmentLine]] = treatment_index(kb.scan("diseases"),
+                                                                                      self.interactions)
+        self.medication_categories: List[str] = self.medication_index.categories
+
+    @property
+    def version(self) -> int:
+        return self.kb.version
+
+    @property
+    def checksum(self) -> str:
+        return self.kb.checksum
+
+    def warm_up(self) -> "Catalog":
+        """Build the lazily compiled parts and run one query so the first user pays nothing extra."""
+        self.symptom_matrix.matrix
+        get_top_diagnoses(["Fever"], 35, "Male", 98.6, "Moderate", "Sudden (minutes-hours)", "< 24 hours",
+                          compiled=self.symptom_matrix)
+        return self
+
+
+def load_catalog(directory: str = DEFAULT_KB_DIR) -> Catalog:
+    return Catalog(KnowledgeBase(directory))
@@ -0,0 +1,129 @@
+"""
+Drug–drug interaction index compiled from the medication records.
+
+A medication's interaction texts ("NSAIDs — increase bleeding risk") and
+contraindications ("Concurrent MAO inhibitors ...") name other drugs and drug
+classes (data/drug_classes.json). Compiling the formulary once turns every
+mention into an undirected edge between the medication and the drug or class
+it names, and records which classes each medication belongs to. Checking a
+new medication against a patient's list then looks up the edges between the
+new drug (or its classes) and each listed drug (or its classes): a few dict
+lookups per listed drug, whatever the size of the formulary.
+
+Contraindications that name the medication's own class are allergy and
+cross-reactivity notes ("Hypersensitivity to statins"), not interactions, and
+are left out.
+"""
+
+import json
+import os
+import re
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple
+
+from .medication_search import MedicationIndex, split_terms
+
+DEFAULT_CLASSES_PATH = os.path.join(os.path.dirname(__file__), "data", "drug_classes.json")
+CONFLICT_KINDS = ("contraindication", "interaction")
+MAX_ALIAS_TERMS = 4
+
+# "Warfarin/NSAIDs — bleeding risk": the drugs are named before the dash
+_SUBJECT_END = re.compile(r"\s+[—–-]\s+")
+
+# (kind, medication whose record has the text, text)
+Note = Tuple[str, str, str]
+
+
+def load_drug_classes(path: str = DEFAULT_CLASSES_PATH) -> Dict[str, Dict]:
+    """Read a drug class table, checking that every class says how to find its members."""
+    with open(path, encoding="utf-8") as fh:
+        classes = json.load(fh)["classes"]
+    for name, spec in classes.items():
+        if not spec.get("categories") and not spec.get("drugs"):
+            raise ValueError(f"drug class {name!r}: needs 'categories' or 'drugs'")
+    return classes
+
+
+class InteractionIndex:
+    """Class membership of every medication plus the interaction edges between medications and classes."""
+
+    def __init__(self, medications: Mapping[str, Mapping], search: MedicationIndex,
+                 classes: Optional[Mapping[str, Dict]] = None):
+        classes = load_drug_classes() if classes is None else classes
+        self._class_aliases: Dict[str, str] = {}
+        for name, spec in classes.items():
+            for alias in (name, *spec.get("aliases", ())):
+                self._class_aliases[" ".join(split_terms(alias))] = name
+        self._drug_aliases = search.aliases
+
+        members = {name: {" ".join(split_terms(drug)) for drug in spec.get("drugs", ())}
+                   for name, spec in classes.items()}
+        self.classes_of: Dict[str, FrozenSet[str]] = {}
+        for drug, record in medications.items():
+            category = record.get("category", "").lower()
+            keys = {" ".join(split_terms(drug)), " ".join(split_terms(record.get("generic", "")))}
+            self.classes_of[drug] = frozenset(
+                name for name, spec in classes.items()
+                if keys & members[name] or any(c.lower() in category for c in spec.get("categories", ())))
+        self.members: Dict[str, Tuple[str, ...]] = {
+            name: tuple(sorted(drug for drug, drug_classes in self.classes_of.items() if name in drug_classes))
+            for name in classes}
+
+        self.edges: Dict[str, Dict[str, List[Note]]] = {}
+        # Many records share the same texts: parse each one once
+        subjects: Dict[str, Set[str]] = {}
+        mentions: Dict[str, Set[str]] = {}
+        for drug, record in medications.items():
+            for text in record.get("interactions", ()):
+                if text not in subjects:
+                    subjects[text] = self.mentions(_SUBJECT_END.split(text, 1)[0])
+                for node in subjects[text] - {drug}:
+                    self._link(drug, node, ("interaction", drug, text))
+            for text in record.get("contraindications", ()):
+                if text not in mentions:
+                    mentions[text] = self.mentions(text)
+                for node in mentions[text] - {drug} - self.classes_of[drug]:
+                    self._link(drug, node, ("contraindication", drug, text))
+
+    def mentions(self, text: str) -> Set[str]:
+        """Medications and classes named in `text` (by any alias, the longest first)."""
+        terms = split_terms(text)
+        found, i = set(), 0
+        while i < len(terms):
+            for n in range(min(MAX_ALIAS_TERMS, len(terms) - i), 0, -1):
+                key = " ".join(terms[i:i + n])
+                node = self._class_aliases.get(key) or self._drug_aliases.get(key)
+                if node is not None:
+                    found.add(node)
+                    i += n
+                    break
+            else:
+                i += 1
+        return found
+
+    def _link(self, a: str, b: str, note: Note) -> None:
+        self.edges.setdefault(a, {}).setdefault(b, []).append(note)
+        self.edges.setdefault(b, {}).setdefault(a, []).append(note)
+
+    def nodes(self, drug: str) -> FrozenSet[str]:
+        return self.classes_of.get(drug, frozenset()) | {drug}
+
+    def check(self, drug: str, current: Iterable[str]) -> List[Dict[str, str]]:
+        """
+        Conflicts of adding `drug` to a patient taking `current`: one dict per
+        note, with the listed "drug" it concerns, its "kind" (see
+        CONFLICT_KINDS, contraindications first), the medication whose record
+        holds the note ("source") and the "note" text.
+        """
+        conflicts, seen = [], set()
+        edges = [self.edges[node] for node in self.nodes(drug) if node in self.edges]
+        for other in current:
+            if other == drug:
+                continue
+            for other_node in self.nodes(other):
+                for neighbours in edges:
+                    for kind, source, text in neighbours.get(other_node, ()):
+                        if (other, source, text) not in seen:
+                            seen.add((other, source, text))
+                            conflicts.append({"drug": other, "kind": kind, "source": source, "note": text})
+        conflicts.sort(key=lambda c: CONFLICT_KINDS.index(c["kind"]))
+        return conflicts
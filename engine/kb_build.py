@@ -0,0 +1,54 @@
+"""
+Rebuild the knowledge-base index from its JSON Lines record files.
+
+Usage:
+    python -m engine.kb_build [directory]
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Dict, Optional, Sequence
+
+from .knowledge_base import DEFAULT_KB_DIR, INDEX_FILE, INDEX_FORMAT, index_records
+
+
+def build_index(directory: str = DEFAULT_KB_DIR) -> Dict:
+    """
+    Scan every record file, write index.json next to them and return it. The
+    version is bumped whenever the record files' checksum changes.
+    """
+    scanned = index_records(directory)
+    index_path = os.path.join(directory, INDEX_FILE)
+    checksum = scanned["checksum"]
+    version = 1
+    if os.path.exists(index_path):
+        with open(index_path, encoding="utf-8") as fh:
+            previous = json.load(fh)
+        version = previous.get("version", 0) + (previous.get("checksum") != checksum)
+
+    index = {"format": INDEX_FORMAT, "version": version, **scanned}
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="\n") as fh:
+        json.dump(index, fh, ensure_ascii=False)
+        fh.write("\n")
+    os.replace(tmp_path, index_path)
+    return index
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m engine.kb_build", description="Rebuild the knowledge-base index after editing its records.")
+    parser.add_argument("directory", nargs="?", default=DEFAULT_KB_DIR,
+                        help="knowledge-base directory (default: engine/data/knowledge_base)")
+    args = parser.parse_args(argv)
+
+    index = build_index(args.directory)
+    counts = ", ".join(f"{len(t['records'])} {name}" for name, t in index["tables"].items())
+    print(f"knowledge base v{index['version']} ({index['checksum'][:15]}...): {counts}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
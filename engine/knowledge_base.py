@@ -0,0 +1,215 @@
+"""
+Disease and medication knowledge base used by the diagnosis engine.
+
+Records live on disk under data/knowledge_base/ as JSON Lines, one record per
+line (diseases.jsonl, medications.jsonl). index.json carries the knowledge-base
+version, a checksum of the record files and, for every record, its byte span
+plus the compact fields needed to score and list it. Opening the knowledge base
+reads only the index; the rest of a record (treatment, red flags, prevention,
+dosing...) is read from its line the first time one of those fields is used.
+Indexes built from the rest of every record (medication search, interactions,
+treatment links) read the record files once with KnowledgeBase.scan() instead,
+so they do not keep every full record in memory.
+
+After editing a record file, rebuild the index with `python -m engine.kb_build`.
+Record files whose checksum no longer matches the index are re-indexed in
+memory when the knowledge base is opened.
+"""
+
+import hashlib
+import json
+import os
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+DEFAULT_KB_DIR = os.path.join(os.path.dirname(__file__), "data", "knowledge_base")
+INDEX_FILE = "index.json"
+INDEX_FORMAT = 1
+# Rule tables the catalog compiles next to the records (diagnosis modifiers, drug classes)
+RULE_FILES = tuple(os.path.join(os.path.dirname(__file__), "data", filename)
+                   for filename in ("modifier_rules.json", "drug_classes.json"))
+
+# table -> (record file, fields copied into the index)
+TABLES = {
+    "diseases": ("diseases.jsonl", ("icd_10", "severity", "symptom_set")),
+    "medications": ("medications.jsonl", ("generic", "brand_names", "category")),
+}
+
+
+def decode_fields(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Restore in-memory types for fields stored as plain JSON."""
+    if "symptom_set" in fields:
+        fields["symptom_set"] = frozenset(fields["symptom_set"])
+    return fields
+
+
+def index_records(directory: str = DEFAULT_KB_DIR) -> Dict:
+    """
+    Scan the record files: byte span and compact fields of every record, plus a
+    sha256 checksum over all files. Returns the "checksum" and "tables" parts of
+    an index.
+    """
+    digest = hashlib.sha256()
+    tables = {}
+    for table, (filename, compact) in TABLES.items():
+        path = os.path.join(directory, filename)
+        records, seen, offset = [], set(), 0
+        with open(path, "rb") as fh:
+            for lineno, line in enumerate(fh, 1):
+                digest.update(line)
+                if line.strip():
+                    record = json.loads(line)
+                    name = record.get("name")
+                    if not name or name in seen:
+                        raise ValueError(f"{path}:{lineno}: missing or duplicate record name {name!r}")
+                    seen.add(name)
+                    records.append({
+                        "name": name, "offset": offset, "length": len(line),
+                        "fields": {field: record[field] for field in compact if field in record},
+                    })
+                offset += len(line)
+        tables[table] = {"file": filename, "size": offset, "records": records}
+    return {"checksum": "sha256:" + digest.hexdigest(), "tables": tables}
+
+
+def records_checksum(directory: str = DEFAULT_KB_DIR) -> str:
+    """sha256 over the record files, the same value index_records() puts in the index."""
+    digest = hashlib.sha256()
+    for filename, _ in TABLES.values():
+        with open(os.path.join(directory, filename), "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(block)
+    return "sha256:" + digest.hexdigest()
+
+
+def kb_fingerprint(directory: str = DEFAULT_KB_DIR) -> Tuple[Tuple[int, int], ...]:
+    """
+    Cheap change marker for a knowledge-base directory: (mtime_ns, size) of the
+    index and record files, plus the rule tables compiled into the catalog.
+    """
+    paths = [os.path.join(directory, filename) for filename in (INDEX_FILE, *(f for f, _ in TABLES.values()))]
+    stats = []
+    for path in (*paths, *RULE_FILES):
+        st = os.stat(path)
+        stats.append((st.st_mtime_ns, st.st_size))
+    return tuple(stats)
+
+
+class LazyRecord(Mapping):
+    """
+    One knowledge-base record. Compact fields come from the index; any other
+    field reads the record's line from disk once and keeps it.
+    """
+
+    __slots__ = ("name", "_compact", "_path", "_offset", "_length", "_full")
+
+    def __init__(self, name: str, compact: Dict[str, Any], path: str, offset: int, length: int):
+        self.name = name
+        self._compact = compact
+        self._path = path
+        self._offset = offset
+        self._length = length
+        self._full: Optional[Dict[str, Any]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._full is not None
+
+    def _load(self) -> Dict[str, Any]:
+        if self._full is None:
+            with open(self._path, "rb") as fh:
+                fh.seek(self._offset)
+                line = fh.read(self._length)
+            record = json.loads(line) if line.strip() else {}
+            if record.pop("name", None) != self.name:
+                raise ValueError(f"{self._path} changed since its index was built; run python -m engine.kb_build")
+            self._full = decode_fields(record)
+        return self._full
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._compact:
+            return self._compact[key]
+        return self._load()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def __repr__(self) -> str:
+        return f"LazyRecord({self.name!r}, {self._compact!r}, loaded={self.loaded})"
+
+
+class KnowledgeBase:
+    """An opened knowledge-base directory: version, checksum and one name -> record dict per table."""
+
+    def __init__(self, directory: str = DEFAULT_KB_DIR):
+        self.directory = directory
+        with open(os.path.join(directory, INDEX_FILE), encoding="utf-8") as fh:
+            index = json.load(fh)
+        if index.get("format") != INDEX_FORMAT:
+            raise ValueError(f"{directory}: unsupported knowledge-base index format {index.get('format')!r}")
+        self.version: int = index["version"]
+        stale = records_checksum(directory) != index["checksum"]
+        if stale:
+            # Record files were edited without rebuilding the index: index them in memory
+            index = {**index, **index_records(directory)}
+        self.stale_index = stale
+        self.checksum: str = index["checksum"]
+
+        self.tables: Dict[str, Dict[str, LazyRecord]] = {}
+        for table, (filename, _) in TABLES.items():
+            path = os.path.join(directory, filename)
+            self.tables[table] = {
+                rec["name"]: LazyRecord(rec["name"], decode_fields(rec["fields"]), path, rec["offset"], rec["length"])
+                for rec in index["tables"][table]["records"]
+            }
+
+    def scan(self, table: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Every full record of `table` by name, read in one pass over its file.
+        Nothing is cached: the caller holds the records only while it needs them.
+        """
+        filename, _ = TABLES[table]
+        records = {}
+        with open(os.path.join(self.directory, filename), "rb") as fh:
+            for line in fh:
+                if line.strip():
+                    record = json.loads(line)
+                    records[record.pop("name")] = decode_fields(record)
+        return records
+
+    @property
+    def diseases(self) -> Dict[str, LazyRecord]:
+        return self.tables["diseases"]
+
+    @property
+    def medications(self) -> Dict[str, LazyRecord]:
+        return self.tables["medications"]
+
+
+_KNOWLEDGE_BASE: Optional[KnowledgeBase] = None
+
+
+def knowledge_base() -> KnowledgeBase:
+    """Process-wide knowledge base opened from DEFAULT_KB_DIR on first use."""
+    global _KNOWLEDGE_BASE
+    if _KNOWLEDGE_BASE is None:
+        _KNOWLEDGE_BASE = KnowledgeBase()
+    return _KNOWLEDGE_BASE
+
+
+class _Table:
+    """Class attribute resolving to one table of the default knowledge base."""
+
+    def __init__(self, table: str):
+        self.table = table
+
+    def __get__(self, obj, owner) -> Dict[str, LazyRecord]:
+        return knowledge_base().tables[self.table]
+
+
+class MedicalDatabase:
+    DISEASES = _Table("diseases")
+    MEDICATIONS = _Table("medications")
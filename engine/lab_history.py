@@ -0,0 +1,128 @@
+"""
+Persistent history of laboratory results for trend and delta queries.
+
+Every measured value is one row (patient, analyte, taken_at, value, unit) in
+an SQLite table declared WITHOUT ROWID, so rows are stored clustered on the
+primary key (patient, analyte, taken_at). "Creatinine over the last two
+years" and "change since the last panel" are then a single range scan or
+two-row seek on that key, however many other patients and analytes the
+table holds.
+
+Times are stored as unix seconds. Naive datetimes passed in are read as local
+time, and every time handed back (series() and change() alike) is naive local
+wall-clock time, so a chart and its caption show the same date.
+"""
+
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+Timestamp = Union[datetime, int, float]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lab_results (
+    patient  TEXT    NOT NULL,
+    analyte  TEXT    NOT NULL,
+    taken_at INTEGER NOT NULL,  -- unix seconds
+    value    REAL    NOT NULL,
+    unit     TEXT    NOT NULL DEFAULT '',
+    PRIMARY KEY (patient, analyte, taken_at)
+) WITHOUT ROWID
+"""
+
+
+def _seconds(moment: Optional[Timestamp]) -> int:
+    if moment is None:
+        return int(datetime.now().timestamp())
+    if isinstance(moment, datetime):
+        return int(moment.timestamp())
+    return int(moment)
+
+
+def _local(seconds: int) -> datetime:
+    return datetime.fromtimestamp(seconds)
+
+
+class LabHistory:
+    """
+    Lab results of every patient, in an SQLite file (or in memory with the
+    default path). Safe to share between Streamlit sessions. A second value
+    for the same patient, analyte and second replaces the first.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+
+    def add_results(self, rows: Iterable[Tuple[str, str, Timestamp, float, str]]) -> int:
+        """Insert (patient, analyte, taken_at, value, unit) rows in one transaction; returns the count."""
+        batch = [(patient, analyte, _seconds(taken_at), float(value), unit or "")
+                 for patient, analyte, taken_at, value, unit in rows]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO lab_results (patient, analyte, taken_at, value, unit) VALUES (?, ?, ?, ?, ?)",
+                batch)
+            self._db.commit()
+        return len(batch)
+
+    def add_panel(self, patient: str, values: Mapping[str, float], taken_at: Optional[Timestamp] = None,
+                  units: Optional[Mapping[str, str]] = None) -> int:
+        """Store one panel ({analyte: value}) measured at `taken_at` (default: now). NaN values are skipped."""
+        moment = _seconds(taken_at)
+        units = units or {}
+        return self.add_results((patient, analyte, moment, value, units.get(analyte, ""))
+                                for analyte, value in values.items() if value == value)
+
+    def series(self, patient: str, analyte: str, since: Optional[Timestamp] = None,
+               until: Optional[Timestamp] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(local times as datetime64[s], values) of one analyte, oldest first, optionally within [since, until]."""
+        low = _seconds(since) if since is not None else -2 ** 63
+        high = _seconds(until) if until is not None else 2 ** 63 - 1
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT taken_at, value FROM lab_results WHERE patient = ? AND analyte = ? "
+                "AND taken_at BETWEEN ? AND ? ORDER BY taken_at", (patient, analyte, low, high)).fetchall()
+        if not rows:
+            return np.empty(0, dtype="datetime64[s]"), np.empty(0)
+        times, values = zip(*rows)
+        return np.array([_local(t) for t in times], dtype="datetime64[s]"), np.array(values, dtype=float)
+
+    def change(self, patient: str, analyte: str, until: Optional[Timestamp] = None) -> Optional[Dict]:
+        """
+        The latest value (at or before `until`) and its change since the
+        previous one, or None when the analyte has never been measured.
+        `previous`, `previous_at` and `delta` are None for a first result.
+        """
+        high = _seconds(until) if until is not None else 2 ** 63 - 1
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT taken_at, value, unit FROM lab_results WHERE patient = ? AND analyte = ? "
+                "AND taken_at <= ? ORDER BY taken_at DESC LIMIT 2", (patient, analyte, high)).fetchall()
+        if not rows:
+            return None
+        (latest_at, latest, unit), previous = rows[0], rows[1] if len(rows) > 1 else None
+        return {
+            "latest": latest, "latest_at": _local(latest_at), "unit": unit,
+            "previous": previous[1] if previous else None,
+            "previous_at": _local(previous[0]) if previous else None,
+            "delta": latest - previous[1] if previous else None,
+        }
+
+    def count(self, patient: Optional[str] = None) -> int:
+        """Stored results, for one patient or in total."""
+        with self._lock:
+            if patient is None:
+                return self._db.execute("SELECT COUNT(*) FROM lab_results").fetchone()[0]
+            return self._db.execute("SELECT COUNT(*) FROM lab_results WHERE patient = ?", (patient,)).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,202 @@
+"""
+Streaming ingest of reference-lab exports: read a large CSV or pipe-delimited
+file in chunks, map analyte codes onto the Lab Results fields, flag each chunk
+with the lab rule table and append the findings to the output as soon as they
+are produced, so memory stays bounded by the chunk size.
+
+Two layouts are accepted:
+    long  one result per row, with panel id, analyte code and value columns
+          (rows of one panel are expected to be contiguous, as labs export them)
+    wide  one panel per row and one column per analyte code or field name
+
+Usage:
+    python -m engine.lab_ingest results.psv -o findings.csv [--chunk-rows 200000]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .labs import FINDING_COLUMNS, LabRuleTable, lab_rules
+
+DEFAULT_CODES_PATH = os.path.join(os.path.dirname(__file__), "data", "lab_codes.json")
+DEFAULT_CHUNK_ROWS = 200_000
+
+
+def load_lab_codes(path: str = DEFAULT_CODES_PATH, fields: Sequence[str] = ()) -> Dict[str, str]:
+    """
+    Read an analyte code map and return {normalized code: field}. Every field
+    name also maps to itself. With `fields`, codes for other fields are an error.
+    """
+    with open(path, encoding="utf-8") as fh:
+        table = json.load(fh)["fields"]
+    codes: Dict[str, str] = {}
+    for field, field_codes in table.items():
+        if fields and field not in fields:
+            raise ValueError(f"lab code map: unknown field {field!r}")
+        for code in [field, *field_codes]:
+            key = normalize_code(code)
+            if codes.get(key, field) != field:
+                raise ValueError(f"lab code map: {code!r} maps to both {codes[key]!r} and {field!r}")
+            codes[key] = field
+    return codes
+
+
+def normalize_code(code: str) -> str:
+    return str(code).strip().upper()
+
+
+def sniff_separator(path: str) -> str:
+    """'|' for pipe-delimited exports, ',' otherwise (judged from the header line)."""
+    opener = gzip.open if path.lower().endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as fh:
+        header = fh.readline()
+    return "|" if header.count("|") > header.count(",") else ","
+
+
+def _split_trailing_panel(chunk: pd.DataFrame, id_column: str):
+    """Split off the rows of the chunk's last panel, which may continue in the next chunk."""
+    ids = chunk[id_column].to_numpy()
+    changes = np.flatnonzero(ids[1:] != ids[:-1])
+    split = changes[-1] + 1 if len(changes) else 0
+    return chunk.iloc[:split], chunk.iloc[split:]
+
+
+def iter_lab_findings(
+    path: str,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    sep: Optional[str] = None,
+    id_column: str = "accession",
+    code_column: str = "code",
+    value_column: str = "value",
+    codes: Optional[Dict[str, str]] = None,
+    table: Optional[LabRuleTable] = None,
+    stats: Optional[Dict[str, int]] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield the findings of `path` chunk by chunk (FINDING_COLUMNS, `panel` holds
+    the panel id). The file is long when it has `code_column`, wide otherwise.
+    Values that are not numbers (e.g. "<0.5") are not flagged. Counts of rows,
+    panels, findings and rows with unmapped codes are added to `stats`.
+    """
+    table = table or lab_rules()
+    codes = codes or load_lab_codes(fields=table.fields)
+    sep = sep or sniff_separator(path)
+    stats = stats if stats is not None else {}
+    for key in ("rows", "panels", "findings", "unmapped_rows"):
+        stats.setdefault(key, 0)
+
+    header = pd.read_csv(path, sep=sep, nrows=0).columns
+    if code_column in header:
+        chunks = _long_panels(path, sep, chunk_rows, id_column, code_column, value_column, codes, stats)
+    else:
+        chunks = _wide_panels(path, sep, chunk_rows, header, id_column, codes, stats)
+    for panels in chunks:
+        findings = table.interpret_frame(panels)
+        stats["panels"] += len(panels)
+        stats["findings"] += len(findings)
+        yield findings
+
+
+def _long_panels(path, sep, chunk_rows, id_column, code_column, value_column, codes, stats) -> Iterator[pd.DataFrame]:
+    reader = pd.read_csv(path, sep=sep, chunksize=chunk_rows, usecols=[id_column, code_column, value_column],
+                         dtype=str, keep_default_na=False)
+    carry = None
+    with reader:
+        for chunk in reader:
+            stats["rows"] += len(chunk)
+            if carry is not None:
+                chunk = pd.concat([carry, chunk], ignore_index=True)
+            chunk, carry = _split_trailing_panel(chunk, id_column)
+            if len(chunk):
+                yield _pivot(chunk, id_column, code_column, value_column, codes, stats)
+    if carry is not None and len(carry):
+        yield _pivot(carry, id_column, code_column, value_column, codes, stats)
+
+
+def _pivot(rows: pd.DataFrame, id_column, code_column, value_column, codes, stats) -> pd.DataFrame:
+    """One row per panel (in file order), one column per field; a repeated analyte keeps its last value."""
+    fields = rows[code_column].str.strip().str.upper().map(codes)
+    mapped = fields.notna().to_numpy()
+    stats["unmapped_rows"] += int((~mapped).sum())
+    long = pd.DataFrame({"panel": rows[id_column].to_numpy()[mapped], "field": fields.to_numpy()[mapped],
+                         "value": pd.to_numeric(rows[value_column].to_numpy()[mapped], errors="coerce")})
+    long = long.drop_duplicates(["panel", "field"], keep="last")
+    return long.pivot(index="panel", columns="field", values="value").reindex(long["panel"].unique())
+
+
+def _wide_panels(path, sep, chunk_rows, header, id_column, codes, stats) -> Iterator[pd.DataFrame]:
+    fields = {column: codes[normalize_code(column)] for column in header if normalize_code(column) in codes}
+    if not fields:
+        raise ValueError(f"{path}: no code column and no analyte columns in the header")
+    if len(set(fields.values())) < len(fields):
+        raise ValueError(f"{path}: several columns map to the same field: {sorted(fields)}")
+    usecols = list(fields) + ([id_column] if id_column in header else [])
+    reader = pd.read_csv(path, sep=sep, chunksize=chunk_rows, usecols=usecols, dtype={id_column: str})
+    with reader:
+        for chunk in reader:
+            stats["rows"] += len(chunk)
+            if id_column in chunk.columns:
+                chunk = chunk.set_index(id_column)
+            yield chunk.rename(columns=fields)
+
+
+def write_findings(findings: Iterator[pd.DataFrame], path: Optional[str], fmt: str = "csv") -> None:
+    """Append each findings frame to a CSV (one header) or JSON Lines file, or stdout."""
+    out = open(path, "w", encoding="utf-8", newline="") if path else sys.stdout
+    try:
+        first = True
+        for frame in findings:
+            if fmt == "jsonl":
+                if len(frame):
+                    out.write(frame.to_json(orient="records", lines=True, force_ascii=False).rstrip("\n") + "\n")
+            elif first or len(frame):
+                frame.to_csv(out, header=first, index=False, columns=FINDING_COLUMNS)
+            first = False
+            out.flush()
+    finally:
+        if path:
+            out.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m engine.lab_ingest",
+        description="Flag abnormal results in a large lab export, streaming it in chunks.")
+    parser.add_argument("input", help="CSV or pipe-delimited lab export (may be .gz)")
+    parser.add_argument("-o", "--output", help="findings file (default: stdout)")
+    parser.add_argument("--format", choices=["csv", "jsonl"],
+                        help="output format (default: jsonl for .jsonl/.ndjson outputs, else csv)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f"rows read per chunk (default: {DEFAULT_CHUNK_ROWS})")
+    parser.add_argument("--sep", help="field separator (default: '|' or ',' from the header)")
+    parser.add_argument("--id-column", default="accession", help="panel id column (default: accession)")
+    parser.add_argument("--code-column", default="code", help="analyte code column of long files (default: code)")
+    parser.add_argument("--value-column", default="value", help="result value column of long files (default: value)")
+    parser.add_argument("--codes", default=DEFAULT_CODES_PATH, help="analyte code map JSON")
+    args = parser.parse_args(argv)
+
+    output = (args.output or "").lower()
+    fmt = args.format or ("jsonl" if output.endswith((".jsonl", ".ndjson")) else "csv")
+    table = lab_rules()
+    stats: Dict[str, int] = {}
+    started = time.perf_counter()
+    write_findings(iter_lab_findings(
+        args.input, chunk_rows=args.chunk_rows, sep=args.sep, id_column=args.id_column,
+        code_column=args.code_column, value_column=args.value_column,
+        codes=load_lab_codes(args.codes, table.fields), table=table, stats=stats), args.output, fmt)
+    print(f"{stats['rows']} rows, {stats['panels']} panels, {stats['findings']} findings "
+          f"({stats['unmapped_rows']} rows with unmapped codes) in {time.perf_counter() - started:.1f} s",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+Rule-based interpretation of a routine laboratory panel.
+
+Reference ranges, status bands and interpretations live in
+data/lab_rules.json. Each analyte's bands compile to a sorted array of
+thresholds and the band that applies between (and at) each pair of them, so
+flagging a value is an interval lookup: bisect for one panel, np.searchsorted
+over a whole column for many.
+"""
+
+import json
+import operator
+import os
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_LAB_RULES_PATH = os.path.join(os.path.dirname(__file__), "data", "lab_rules.json")
+
+# (analyte, value, status, reference range, interpretation)
+Finding = Tuple[str, float, str, str, str]
+
+_CONDITIONS = {"below": operator.lt, "above": operator.gt}
+_BAND_FIELDS = ("status", "when", "interpretation")
+FINDING_COLUMNS = ["panel", "analyte", "value", "status", "reference", "interpretation", "alert"]
+
+
+def load_lab_rules(path: str = DEFAULT_LAB_RULES_PATH) -> List[Dict]:
+    """Read and validate a lab rule table."""
+    with open(path, encoding="utf-8") as fh:
+        analytes = json.load(fh)["analytes"]
+    fields = set()
+    for analyte in analytes:
+        field = analyte["field"]
+        if field in fields:
+            raise ValueError(f"lab rule {field!r}: analyte listed twice")
+        fields.add(field)
+        for i, band in enumerate(analyte["bands"]):
+            missing = [key for key in _BAND_FIELDS if key not in band]
+            if missing:
+                raise ValueError(f"lab rule {field!r} band {i}: missing {missing}")
+            if len(band["when"]) != 1 or set(band["when"]) - set(_CONDITIONS):
+                raise ValueError(f"lab rule {field!r} band {i}: 'when' needs exactly one of {sorted(_CONDITIONS)}")
+    return analytes
+
+
+def _band_at(bands: List[Dict], value: float) -> int:
+    """Index of the first band whose condition holds for `value`, or -1."""
+    for i, band in enumerate(bands):
+        (condition, threshold), = band["when"].items()
+        if _CONDITIONS[condition](value, threshold):
+            return i
+    return -1
+
+
+class LabRuleTable:
+    """
+    A lab rule table compiled into interval lookups. For each analyte, k
+    distinct thresholds split the number line into 2k + 1 regions (the open
+    intervals and the thresholds themselves); the band chain is constant on
+    each region, so it is evaluated once per region at compile time.
+    """
+
+    def __init__(self, analytes: List[Dict]):
+        self.analytes = analytes
+        self.fields = tuple(analyte["field"] for analyte in analytes)
+        self.names = {analyte["field"]: analyte["analyte"] for analyte in analytes}
+        self.units = {analyte["field"]: analyte.get("unit", "") for analyte in analytes}
+        self.thresholds: List[List[float]] = []
+        self.regions: List[np.ndarray] = []
+        # per analyte: (field, thresholds, finding-and-alert per region or None)
+        self._lookup: List[Tuple[str, List[float], List[Optional[Tuple[str, str, str, str, Optional[str]]]]]] = []
+        for analyte in analytes:
+            edges = sorted({float(threshold) for band in analyte["bands"] for threshold in band["when"].values()})
+            points = [edges[0] - 1.0] if edges else [0.0]
+            for i, edge in enumerate(edges):
+                points.append(edge)
+                points.append((edge + edges[i + 1]) / 2 if i + 1 < len(edges) else edge + 1.0)
+            regions = [_band_at(analyte["bands"], p) for p in points]
+            self.thresholds.append(edges)
+            self.regions.append(np.array(regions, dtype=np.int64))
+            outcomes = [None if r < 0 else (analyte["analyte"], analyte["bands"][r]["status"], analyte["reference"],
+                                            analyte["bands"][r]["interpretation"], analyte["bands"][r].get("alert"))
+                        for r in regions]
+            self._lookup.append((analyte["field"], edges, outcomes))
+
+        # Every (analyte, band) pair gets a code in table order; the frame
+        # output maps codes to categorical text columns
+        self._band_offsets = np.cumsum([0] + [len(analyte["bands"]) for analyte in analytes[:-1]])
+        per_band = {
+            "analyte": [a["analyte"] for a in analytes for _ in a["bands"]],
+            "status": [band["status"] for a in analytes for band in a["bands"]],
+            "reference": [a["reference"] for a in analytes for _ in a["bands"]],
+            "interpretation": [band["interpretation"] for a in analytes for band in a["bands"]],
+            "alert": [band.get("alert") for a in analytes for band in a["bands"]],
+        }
+        self._band_columns: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        for name, texts in per_band.items():
+            categories = list(dict.fromkeys(text for text in texts if text))
+            self._band_columns[name] = (categories, np.array(
+                [categories.index(text) if text else -1 for text in texts], dtype=np.int64))
+
+    @classmethod
+    def compile(cls, path: str = DEFAULT_LAB_RULES_PATH) -> "LabRuleTable":
+        return cls(load_lab_rules(path))
+
+    def band(self, index: int, value: float) -> int:
+        """Band of analyte `index` that `value` falls in, or -1 (also for NaN)."""
+        if value != value:
+            return -1
+        edges = self.thresholds[index]
+        return int(self.regions[index][bisect_left(edges, value) + bisect_right(edges, value)])
+
+    def bands(self, index: int, values: np.ndarray) -> np.ndarray:
+        """Vectorized band(): one band index per value, -1 where nothing applies."""
+        edges = np.asarray(self.thresholds[index])
+        region = np.searchsorted(edges, values, "left") + np.searchsorted(edges, values, "right")
+        found = self.regions[index][region]
+        found[np.isnan(values)] = -1
+        return found
+
+    def interpret(self, values: Mapping[str, float]) -> Tuple[List[Finding], List[str]]:
+        """Findings (in table order) and alerts for one panel keyed by field name."""
+        findings: List[Finding] = []
+        alerts: List[str] = []
+        for field, edges, outcomes in self._lookup:
+            value = values[field]
+            if value != value:
+                continue
+            outcome = outcomes[bisect_left(edges, value) + bisect_right(edges, value)]
+            if outcome is None:
+                continue
+            name, status, reference, interpretation, alert = outcome
+            findings.append((name, value, status, reference, interpretation))
+            if alert:
+                alerts.append(alert)
+        return findings, alerts
+
+    def interpret_frame(self, panels):
+        """
+        Flag every panel (row) of a DataFrame whose columns are field names.
+        Returns one row per finding with FINDING_COLUMNS, ordered by panel and
+        then table order; `panel` holds the input index label, the text
+        columns are categoricals and `alert` is NaN for findings without an
+        action item. Missing columns are skipped.
+        """
+        import pandas as pd  # the interactive page and the scoring engine do not need pandas
+
+        rows, codes, values = [], [], []
+        for index, field in enumerate(self.fields):
+            if field not in panels.columns:
+                continue
+            column = pd.to_numeric(panels[field], errors="coerce").to_numpy(dtype=float)
+            found = self.bands(index, column)
+            hit = np.flatnonzero(found >= 0)
+            rows.append(hit)
+            codes.append(found[hit] + self._band_offsets[index])
+            values.append(column[hit])
+        if not rows:
+            return pd.DataFrame(columns=FINDING_COLUMNS)
+
+        row = np.concatenate(rows)
+        # rows were gathered analyte by analyte, so a stable sort keeps table order within a panel
+        order = np.argsort(row, kind="stable")
+        code = np.concatenate(codes)[order]
+        frame = {"panel": panels.index.to_numpy()[row[order]]}
+        for name, (categories, category_codes) in self._band_columns.items():
+            frame[name] = pd.Categorical.from_codes(category_codes[code], categories)
+        frame["value"] = np.concatenate(values)[order]
+        return pd.DataFrame(frame, columns=FINDING_COLUMNS)
+
+
+_LAB_RULES: Optional[LabRuleTable] = None
+
+
+def lab_rules() -> LabRuleTable:
+    """Process-wide compiled lab rule table, built on first use."""
+    global _LAB_RULES
+    if _LAB_RULES is None:
+        _LAB_RULES = LabRuleTable.compile()
+    return _LAB_RULES
+
+
+def interpret_labs(
+    wbc: float, hemoglobin: float, platelets: float, mcv: float,
+    glucose: float, creatinine: float, potassium: float, sodium: float, calcium: float,
+    ldl: float, triglycerides: float, hdl: float,
+    tsh: float, t4_free: float
+) -> Tuple[List[Finding], List[str]]:
+    """
+    Flag abnormal CBC, metabolic, lipid and thyroid results.
+    Returns (findings, alerts): one finding per abnormal analyte in panel
+    order, plus the clinical action items some findings raise.
+    """
+    return lab_rules().interpret({
+        "wbc": wbc, "hemoglobin": hemoglobin, "platelets": platelets, "mcv": mcv,
+        "glucose": glucose, "creatinine": creatinine, "potassium": potassium, "sodium": sodium,
+        "calcium": calcium, "ldl": ldl, "triglycerides": triglycerides, "hdl": hdl,
+        "tsh": tsh, "t4_free": t4_free,
+    })
+
+
+def interpret_lab_frame(panels, table: Optional[LabRuleTable] = None):
+    """interpret_labs() for a DataFrame of panels (one per row, columns named like its arguments)."""
+    return (table or lab_rules()).interpret_frame(panels)
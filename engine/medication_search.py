@@ -0,0 +1,219 @@
+"""
+Search index over the medication table: ranked, typo-tolerant lookup by name,
+brand, generic name, category, indication and mechanism, cheap enough to run
+on every keystroke.
+
+Every field is split into lowercase terms. The vocabulary is kept sorted, so
+the terms starting with a prefix form one contiguous range (a flattened
+prefix trie, found by bisection), and the postings (medication id, field
+weight) are stored term after term in flat arrays: a whole prefix range is
+one slice. Each query term matches as a prefix; a term matching nothing falls
+back to the vocabulary terms sharing enough trigrams with it. The suffixes of
+every name, generic-name and brand-name term are kept the same way, so a
+one-word query found inside a name is also one slice. Names, generic
+names and brand names also go into an alias table pointing at their
+medication, so an exact brand name ranks its medication first. Medications
+whose name, generic name or a brand name contains the query as a plain
+substring are always found too ("olol" finds the beta-blockers, "pril" finds
+Lisinopril), and rank above those matched by their terms alone.
+"""
+
+import bisect
+import re
+from typing import Dict, List, Mapping, Optional, Set, Tuple
+
+import numpy as np
+
+# field -> weight of a match in it; per query term a medication keeps its best match
+FIELD_WEIGHTS = {"name": 1.0, "brand_names": 0.95, "generic": 0.9, "category": 0.6,
+                 "indications": 0.5, "mechanism": 0.3}
+PREFIX_FACTOR = 0.85          # a term that only starts with the query term
+FUZZY_MIN_LENGTH = 3
+FUZZY_MIN_SIMILARITY = 0.45   # Dice coefficient of the trigram sets
+FUZZY_TERMS = 20              # closest vocabulary terms tried for a misspelt term
+
+_TERM = re.compile(r"[^\W_]+")
+
+
+def split_terms(text: str) -> List[str]:
+    return _TERM.findall(text.lower())
+
+
+def trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _prefix_end(prefix: str) -> str:
+    """Smallest string greater than every string starting with `prefix`."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class MedicationIndex:
+    """Immutable search index over a name -> medication record mapping."""
+
+    def __init__(self, medications: Mapping[str, Mapping]):
+        self.names: List[str] = sorted(medications)
+        categories = [medications[name].get("category", "") for name in self.names]
+        self.categories: List[str] = sorted(set(categories))
+        self._category_ids = {category: i for i, category in enumerate(self.categories)}
+        self._category_of = np.array([self._category_ids[c] for c in categories], dtype=np.int32)
+
+        self.aliases: Dict[str, str] = {}
+        names_texts = []
+        postings: Dict[str, Dict[int, float]] = {}
+        suffixes: Dict[str, Set[int]] = {}
+        for doc, name in enumerate(self.names):
+            record = medications[name]
+            for field, weight in FIELD_WEIGHTS.items():
+                value = name if field == "name" else record.get(field)
+                for text in [value] if isinstance(value, str) else value or ():
+                    for term in split_terms(text):
+                        docs = postings.setdefault(term, {})
+                        if docs.get(doc, 0.0) < weight:
+                            docs[doc] = weight
+            for alias in (name, record.get("generic", ""), *record.get("brand_names", ())):
+                key = " ".join(split_terms(alias))
+                if key:
+                    self.aliases.setdefault(key, name)
+            names_text = "\n".join((name, record.get("generic", ""), *record.get("brand_names", ()))).lower()
+            names_texts.append(names_text)
+            for term in set(split_terms(names_text)):
+                for start in range(len(term)):
+                    suffixes.setdefault(term[start:], set()).add(doc)
+
+        # Lowercased name, generic name and brand names of every medication in one string, for
+        # substring queries spanning several terms: str.find scans it at C speed, and
+        # _names_starts maps offsets back to ids
+        self._names_blob = "\0".join(names_texts)
+        self._names_starts = np.cumsum([0] + [len(text) + 1 for text in names_texts[:-1]]).tolist()
+
+        self.terms: List[str] = sorted(postings)
+        self._offsets = np.zeros(len(self.terms) + 1, dtype=np.int64)
+        np.cumsum([len(postings[term]) for term in self.terms], out=self._offsets[1:])
+        size = int(self._offsets[-1])
+        self._docs = np.fromiter((doc for term in self.terms for doc in postings[term]), np.int32, size)
+        self._weights = np.fromiter((w for term in self.terms for w in postings[term].values()), np.float32, size)
+
+        self._suffixes: List[str] = sorted(suffixes)
+        self._suffix_offsets = np.zeros(len(self._suffixes) + 1, dtype=np.int64)
+        np.cumsum([len(suffixes[suffix]) for suffix in self._suffixes], out=self._suffix_offsets[1:])
+        self._suffix_docs = np.fromiter((doc for suffix in self._suffixes for doc in suffixes[suffix]),
+                                        np.int32, int(self._suffix_offsets[-1]))
+
+        grams: Dict[str, List[int]] = {}
+        self._gram_counts = np.empty(len(self.terms), dtype=np.int32)
+        for i, term in enumerate(self.terms):
+            term_grams = trigrams(term)
+            self._gram_counts[i] = len(term_grams)
+            for gram in term_grams:
+                grams.setdefault(gram, []).append(i)
+        self._grams = {gram: np.array(ids, dtype=np.int32) for gram, ids in grams.items()}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """The medication whose name, generic name or a brand name is `name` (any case), if any."""
+        return self.aliases.get(" ".join(split_terms(name)))
+
+    def search(self, query: str, category: Optional[str] = None,
+               limit: Optional[int] = None) -> Tuple[List[str], int]:
+        """
+        The medications matching every term of `query`, or whose name,
+        generic name or a brand name contains `query` (and in `category` if
+        given): the names of the best `limit` of them and the number of
+        matches. The medication `query` names comes first, then the substring
+        matches, then the rest; within each, by term score with ties by name.
+        An empty query lists the whole category, or every medication, by name.
+        """
+        if category is None:
+            in_category = np.ones(len(self.names), dtype=bool)
+        elif category in self._category_ids:
+            in_category = self._category_of == self._category_ids[category]
+        else:
+            return [], 0
+        words = split_terms(query)
+        if not words:
+            hits = np.flatnonzero(in_category)
+            return [self.names[i] for i in hits[:limit]], len(hits)
+
+        matched = in_category.copy()
+        total = np.zeros(len(self.names), dtype=np.float32)
+        for word in words:
+            scores = self._word_scores(word)
+            matched &= scores > 0
+            if not matched.any():
+                # Only substring matches are left: list them by name
+                total[:] = 0
+                break
+            total += scores
+        # A term scores at most 1, so a bonus of one per term puts each tier above the next
+        tier = float(len(words))
+        substring = self._substring_matches(query)
+        if category is not None:
+            substring &= in_category
+        np.add(total, tier, out=total, where=substring)
+        matched |= substring
+        alias = self.resolve(query)
+        if alias is not None:
+            total[bisect.bisect_left(self.names, alias)] += 2 * tier
+        hits = np.flatnonzero(matched)
+        count = len(hits)
+        if limit is not None and count > limit:
+            # Keep the `limit` best before sorting; among scores tied with the last one, the first names
+            scores = total[hits]
+            kth = np.partition(scores, count - limit)[count - limit]
+            above = hits[scores > kth]
+            hits = np.concatenate([above, hits[scores == kth][:limit - len(above)]])
+            hits.sort()
+        return [self.names[i] for i in hits[np.argsort(-total[hits], kind="stable")]], count
+
+    def _substring_matches(self, query: str) -> np.ndarray:
+        """Which medications have a name, generic name or brand name containing `query` (any case)."""
+        found = np.zeros(len(self.names), dtype=bool)
+        needle = query.strip().lower()
+        if _TERM.fullmatch(needle):
+            # Inside one term: the suffixes starting with it are one slice
+            lo = bisect.bisect_left(self._suffixes, needle)
+            hi = bisect.bisect_left(self._suffixes, _prefix_end(needle), lo)
+            found[self._suffix_docs[self._suffix_offsets[lo]:self._suffix_offsets[hi]]] = True
+            return found
+        pos = self._names_blob.find(needle) if needle else -1
+        while pos >= 0:
+            doc = bisect.bisect_right(self._names_starts, pos) - 1
+            found[doc] = True
+            if doc + 1 == len(self.names):
+                break
+            pos = self._names_blob.find(needle, self._names_starts[doc + 1])
+        return found
+
+    def _word_scores(self, word: str) -> np.ndarray:
+        """Best weight per medication of a vocabulary term starting with (or else resembling) `word`."""
+        scores = np.zeros(len(self.names), dtype=np.float32)
+        lo = bisect.bisect_left(self.terms, word)
+        hi = bisect.bisect_left(self.terms, _prefix_end(word), lo)
+        if lo < hi:
+            start, end = self._offsets[lo], self._offsets[hi]
+            weights = self._weights[start:end] * PREFIX_FACTOR
+            if self.terms[lo] == word:
+                exact = self._offsets[lo + 1] - start
+                weights[:exact] = self._weights[start:start + exact]
+            np.maximum.at(scores, self._docs[start:end], weights)
+        elif len(word) >= FUZZY_MIN_LENGTH:
+            for term, similarity in self._similar_terms(word):
+                start, end = self._offsets[term], self._offsets[term + 1]
+                np.maximum.at(scores, self._docs[start:end], self._weights[start:end] * similarity * PREFIX_FACTOR)
+        return scores
+
+    def _similar_terms(self, word: str) -> List[Tuple[int, float]]:
+        """Up to FUZZY_TERMS (term id, similarity) pairs, most similar first."""
+        word_grams = trigrams(word)
+        ids = [self._grams[gram] for gram in word_grams if gram in self._grams]
+        if not ids:
+            return []
+        shared = np.bincount(np.concatenate(ids), minlength=len(self.terms))
+        similarity = 2 * shared / (len(word_grams) + self._gram_counts)
+        candidates = np.flatnonzero(similarity >= FUZZY_MIN_SIMILARITY)
+        best = candidates[np.argsort(-similarity[candidates], kind="stable")[:FUZZY_TERMS]]
+        return [(int(term), float(similarity[term])) for term in best]
@@ -0,0 +1,134 @@
+"""
+Clinical modifier rules loaded from a data table and compiled into
+per-disease weight vectors.
+
+Each rule in data/modifier_rules.json says when it fires (conditions on the
+encounter) and which diseases it reweights. Compiling the table once gives a
+(rules × diseases) weight matrix; scoring an encounter is then a product of
+the rows of the rules that fired.
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "data", "modifier_rules.json")
+
+# Past-medical-history flags collected by the Symptom Analyzer (Step 4)
+PMH_FIELDS = ("diabetes", "hypertension", "cardiovascular", "asthma", "cancer",
+              "immunocompromised", "drug_allergies", "recent_surgery", "family_history")
+
+_RANGE_CONDITIONS = {
+    "temperature_min": ("temperature", np.greater_equal),
+    "temperature_max": ("temperature", np.less),
+    "age_min": ("age", np.greater_equal),
+    "age_max": ("age", np.less),
+}
+_CHOICE_CONDITIONS = ("gender", "severity", "onset", "duration")
+_CONDITIONS = set(_RANGE_CONDITIONS) | set(_CHOICE_CONDITIONS) | {"symptom", "pmh"}
+
+Context = Dict[str, np.ndarray]
+
+
+def load_rules(path: str = DEFAULT_RULES_PATH) -> List[Dict]:
+    """Read and validate a modifier rule table."""
+    with open(path, encoding="utf-8") as fh:
+        rules = json.load(fh)["rules"]
+    for i, rule in enumerate(rules):
+        unknown = set(rule.get("when", {})) - _CONDITIONS
+        if unknown:
+            raise ValueError(f"modifier rule {i}: unknown condition(s) {sorted(unknown)}")
+        if "diseases" not in rule and "severity_contains" not in rule:
+            raise ValueError(f"modifier rule {i}: needs 'diseases' or 'severity_contains'")
+        pmh = rule.get("when", {}).get("pmh")
+        if pmh is not None and pmh not in PMH_FIELDS:
+            raise ValueError(f"modifier rule {i}: unknown pmh flag {pmh!r}")
+    return rules
+
+
+def encounter_context(
+    symptoms: Mapping[str, Sequence[bool]],
+    ages: Sequence[float],
+    genders: Sequence[str],
+    temperatures: Sequence[float],
+    severities: Sequence[str],
+    onsets: Sequence[str],
+    durations: Sequence[str],
+    pmh: Optional[Mapping[str, Sequence[bool]]] = None
+) -> Context:
+    """
+    Per-encounter arrays the rule conditions are evaluated on. `symptoms` maps
+    each symptom named by a rule to whether each encounter reported it.
+    """
+    count = len(ages)
+    pmh = pmh or {}
+    return {
+        "symptoms": {name: np.asarray(flags, dtype=bool) for name, flags in symptoms.items()},
+        "pmh": {field: np.asarray(pmh.get(field, np.zeros(count)), dtype=bool) for field in PMH_FIELDS},
+        "age": np.asarray(ages, dtype=float), "gender": np.asarray(genders, dtype=object),
+        "temperature": np.asarray(temperatures, dtype=float), "severity": np.asarray(severities, dtype=object),
+        "onset": np.asarray(onsets, dtype=object), "duration": np.asarray(durations, dtype=object),
+    }
+
+
+class ModifierTable:
+    """A rule table compiled against one disease list."""
+
+    def __init__(self, rules: List[Dict], names: Sequence[str], severities: Sequence[str]):
+        self.rules = rules
+        self.signature = hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).hexdigest()
+        self.symptoms = sorted({rule["when"]["symptom"] for rule in rules if "symptom" in rule.get("when", {})})
+        self.weights = np.ones((len(rules), len(names)))
+        for r, rule in enumerate(rules):
+            mask = np.isin(names, rule.get("diseases", []))
+            if "severity_contains" in rule:
+                mask |= np.array([rule["severity_contains"] in sev for sev in severities], dtype=bool)
+            self.weights[r, mask] = float(rule["weight"])
+
+        # Largest modifier each disease can reach: every rule that could raise it fires
+        self.max_modifier = np.ones(len(names))
+        for weights in self.weights:
+            self.max_modifier *= np.maximum(weights, 1.0)
+
+    @classmethod
+    def compile(cls, names: Sequence[str], severities: Sequence[str],
+                path: str = DEFAULT_RULES_PATH) -> "ModifierTable":
+        return cls(load_rules(path), names, severities)
+
+    def fired(self, context: Context) -> np.ndarray:
+        """(rules × encounters) boolean array of which rules apply to each encounter."""
+        count = len(context["age"])
+        fired = np.ones((len(self.rules), count), dtype=bool)
+        for r, rule in enumerate(self.rules):
+            for key, value in rule.get("when", {}).items():
+                if key == "symptom":
+                    fired[r] &= context["symptoms"].get(value, np.zeros(count, dtype=bool))
+                elif key == "pmh":
+                    fired[r] &= context["pmh"][value]
+                elif key in _RANGE_CONDITIONS:
+                    field, compare = _RANGE_CONDITIONS[key]
+                    fired[r] &= compare(context[field], value)
+                else:
+                    # == per choice is much cheaper than np.isin on object arrays
+                    values = context[key]
+                    fired[r] &= np.logical_or.reduce([values == choice for choice in value])
+        return fired
+
+    def modifiers(self, fired: np.ndarray, columns=slice(None)) -> np.ndarray:
+        """
+        (encounters × diseases) modifier weights. Encounters that fire the same
+        rules share one product of weight rows, taken in rule order.
+        """
+        weights = self.weights[:, columns]
+        if fired.shape[1] == 1:
+            patterns, inverse = fired.T, np.zeros(1, dtype=np.intp)
+        else:
+            patterns, inverse = np.unique(fired.T, axis=0, return_inverse=True)
+        products = np.ones((len(patterns), weights.shape[1]))
+        for p, pattern in enumerate(patterns):
+            if pattern.any():
+                products[p] = np.prod(weights[pattern], axis=0)
+        return products[inverse.reshape(-1)]
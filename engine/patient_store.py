@@ -0,0 +1,363 @@
+"""
+Persistent per-patient app data: consultation records, the medication list,
+appointments, lab panel entries and health goals.
+
+Everything lives in one SQLite file in WAL mode, so readers never wait for
+the writer, shared by every session in the process through a small pool of
+connections. Each connection keeps its compiled statements (the SQL strings
+below are constant, so they are prepared once per connection and reused).
+Queries are served by per-patient indexes (consultations by time, by severity
+and time, by confidence, and by severity and confidence), so pages fetch only
+the rows they show and server memory no longer grows with the history of
+every active session. Consultations are paged with keyset cursors (the sort
+key of the last row shown), and triggers keep per-severity counts, so any
+page of any filter and order costs the same however long the history is.
+"""
+
+import json
+import queue
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+DEFAULT_POOL_SIZE = 4
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS consultations (
+    id         INTEGER PRIMARY KEY,
+    patient    TEXT    NOT NULL,
+    taken_at   INTEGER NOT NULL,  -- the record's local date and time as seconds since the epoch
+    severity   TEXT    NOT NULL DEFAULT '',
+    confidence REAL    NOT NULL DEFAULT 0,
+    record     TEXT    NOT NULL   -- the full record as JSON
+);
+CREATE INDEX IF NOT EXISTS consultations_by_time ON consultations (patient, taken_at);
+CREATE INDEX IF NOT EXISTS consultations_by_severity ON consultations (patient, severity, taken_at);
+CREATE INDEX IF NOT EXISTS consultations_by_confidence ON consultations (patient, confidence DESC);
+CREATE INDEX IF NOT EXISTS consultations_by_severity_confidence
+    ON consultations (patient, severity, confidence DESC);
+
+CREATE TABLE IF NOT EXISTS consultation_counts (
+    patient          TEXT    NOT NULL,
+    severity         TEXT    NOT NULL,
+    count            INTEGER NOT NULL,
+    confidence_total REAL    NOT NULL,
+    PRIMARY KEY (patient, severity)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS consultations_counted AFTER INSERT ON consultations BEGIN
+    INSERT OR IGNORE INTO consultation_counts VALUES (new.patient, new.severity, 0, 0);
+    UPDATE consultation_counts SET count = count + 1, confidence_total = confidence_total + new.confidence
+    WHERE patient = new.patient AND severity = new.severity;
+END;
+CREATE TRIGGER IF NOT EXISTS consultations_uncounted AFTER DELETE ON consultations BEGIN
+    UPDATE consultation_counts SET count = count - 1, confidence_total = confidence_total - old.confidence
+    WHERE patient = old.patient AND severity = old.severity;
+END;
+
+CREATE TABLE IF NOT EXISTS medications (
+    id         INTEGER PRIMARY KEY,
+    patient    TEXT NOT NULL,
+    name       TEXT NOT NULL,
+    added_date TEXT NOT NULL,
+    entry      TEXT NOT NULL,
+    UNIQUE (patient, name)
+);
+
+CREATE TABLE IF NOT EXISTS appointments (
+    id      INTEGER PRIMARY KEY,
+    patient TEXT NOT NULL,
+    date    TEXT NOT NULL,  -- 'YYYY-MM-DD HH:MM'
+    entry   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS appointments_by_patient ON appointments (patient);
+
+CREATE TABLE IF NOT EXISTS lab_panels (
+    id            INTEGER PRIMARY KEY,
+    patient       TEXT    NOT NULL,
+    date          TEXT    NOT NULL,
+    abnormalities INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lab_panels_by_date ON lab_panels (patient, date);
+
+CREATE TABLE IF NOT EXISTS health_goals (
+    patient TEXT PRIMARY KEY,
+    goals   TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Record orders of the Medical Records page -> (sort column, descending, ids descending)
+CONSULTATION_ORDERS = {
+    "recent": ("taken_at", True, True),
+    "oldest": ("taken_at", False, False),
+    "confidence": ("confidence", True, False),
+}
+RECORD_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+_EPOCH = datetime(1970, 1, 1)
+# PRAGMA user_version of _SCHEMA; 0 is a new file or the first layout (consultations keyed by text `date`)
+SCHEMA_VERSION = 1
+
+# Sort key of the last row of a page: (sort column value, id)
+Cursor = Tuple[float, int]
+
+
+def _record_seconds(date: str) -> int:
+    """A record's 'YYYY-MM-DD HH:MM:SS' local time as seconds since the epoch (0 when unreadable)."""
+    try:
+        return int((datetime.strptime(date, RECORD_DATE_FORMAT) - _EPOCH).total_seconds())
+    except (TypeError, ValueError):
+        return 0
+
+
+def _statements(script: str) -> Iterator[str]:
+    """The statements of an SQL script one by one (executescript() would commit the open transaction)."""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            yield statement.strip()
+            statement = ""
+
+
+def _columns(db: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in db.execute(f"PRAGMA table_info({table})")]
+
+
+# Version 0 -> 1: consultations.date ('YYYY-MM-DD HH:MM:SS' text) becomes taken_at (INTEGER seconds).
+# The column's type changes, so the table is rebuilt rather than the column renamed in place. Both
+# steps run in the transaction that creates the schema, so a crash part way leaves version 0 intact.
+
+def _detach_consultations(db: sqlite3.Connection) -> None:
+    """Move the version 0 table out of the way of _SCHEMA, dropping its indexes (their names are reused)."""
+    for name in ("consultations_by_date", "consultations_by_severity", "consultations_by_confidence"):
+        db.execute(f"DROP INDEX IF EXISTS {name}")
+    db.execute("ALTER TABLE consultations RENAME TO consultations_v0")
+
+
+def _copy_consultations(db: sqlite3.Connection) -> None:
+    """Fill the new table from the version 0 one; the insert trigger counts every copied row."""
+    db.create_function("record_seconds", 1, _record_seconds, deterministic=True)
+    db.execute("INSERT INTO consultations (id, patient, taken_at, severity, confidence, record) "
+               "SELECT id, patient, record_seconds(date), severity, confidence, record FROM consultations_v0")
+    db.execute("DROP TABLE consultations_v0")
+
+
+class ConnectionPool:
+    """
+    Up to `size` SQLite connections to one database, handed out one per
+    caller. File databases are switched to WAL mode; ":memory:" gets a single
+    connection, since every connection would open a database of its own.
+    """
+
+    def __init__(self, path: str, size: int = DEFAULT_POOL_SIZE):
+        self.path = path
+        self.memory = path == ":memory:"
+        size = 1 if self.memory else size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        self._slots = queue.Queue()
+        for _ in range(size):
+            self._slots.put(None)
+        # Pooled connections stay open until close()
+        self._idle.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30, check_same_thread=False, cached_statements=256)
+        if not self.memory:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+        self._all.append(db)
+        return db
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """A connection for the duration of the block; commits on success, rolls back on error."""
+        self._slots.get()
+        try:
+            try:
+                db = self._idle.get_nowait()
+            except queue.Empty:
+                db = self._connect()
+            try:
+                with db:
+                    yield db
+            finally:
+                self._idle.put(db)
+        finally:
+            self._slots.put(None)
+
+    def close(self) -> None:
+        for db in self._all:
+            db.close()
+        self._all.clear()
+
+
+class PatientStore:
+    """
+    Consultations, medications, appointments, lab panel entries and goals of
+    every patient, in an SQLite file (or in memory with the default path).
+    Safe to share between Streamlit sessions.
+    """
+
+    def __init__(self, path: str = ":memory:", pool_size: int = DEFAULT_POOL_SIZE):
+        self.path = path
+        self.pool = ConnectionPool(path, pool_size)
+        with self.pool.connection() as db:
+            # One write transaction for the migration, the schema and the version (committed on exit)
+            db.execute("BEGIN IMMEDIATE")
+            version = db.execute("PRAGMA user_version").fetchone()[0]
+            text_dates = version < 1 and "date" in _columns(db, "consultations")
+            if text_dates:
+                _detach_consultations(db)
+            for statement in _statements(_SCHEMA):
+                db.execute(statement)
+            if text_dates:
+                _copy_consultations(db)
+            db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    # ----- consultations -----
+
+    def add_consultation(self, patient: str, record: Mapping) -> int:
+        """Store one Symptom Analyzer record; returns its id."""
+        with self.pool.connection() as db:
+            cur = db.execute(
+                "INSERT INTO consultations (patient, taken_at, severity, confidence, record) VALUES (?, ?, ?, ?, ?)",
+                (patient, _record_seconds(record.get("date", "")), record.get("severity", ""),
+                 record.get("confidence", 0), json.dumps(record)))
+            return cur.lastrowid
+
+    def consultation_page(self, patient: str, severity: Optional[str] = None, order: str = "recent",
+                          after: Optional[Cursor] = None, limit: int = 10) -> Tuple[List[Dict], Optional[Cursor]]:
+        """
+        Up to `limit` records of one patient (optionally of one severity) in
+        CONSULTATION_ORDERS order, starting after the row `after` points at,
+        and the cursor of the next page (None on the last page). Each page is
+        one index range scan of `limit` + 1 rows.
+        """
+        column, descending, ids_descending = CONSULTATION_ORDERS[order]
+        sql = f"SELECT {column}, id, record FROM consultations WHERE patient = ?"
+        args: Tuple = (patient,)
+        if severity is not None:
+            sql += " AND severity = ?"
+            args += (severity,)
+        if after is not None:
+            key_op, id_op = "<" if descending else ">", "<" if ids_descending else ">"
+            # The first term bounds the index range; the second breaks ties on the id
+            sql += f" AND {column} {key_op}= ? AND ({column} {key_op} ? OR id {id_op} ?)"
+            args += (after[0], after[0], after[1])
+        sql += (f" ORDER BY {column}{' DESC' if descending else ''}, id{' DESC' if ids_descending else ''}"
+                " LIMIT ?")
+        args += (limit + 1,)
+        with self.pool.connection() as db:
+            rows = db.execute(sql, args).fetchall()
+        cursor = (rows[limit - 1][0], rows[limit - 1][1]) if len(rows) > limit else None
+        return [json.loads(row[2]) for row in rows[:limit]], cursor
+
+    def consultations(self, patient: str, severity: Optional[str] = None, order: str = "recent",
+                      limit: Optional[int] = None) -> List[Dict]:
+        """The first `limit` records (default: all) of one patient, as consultation_page() orders them."""
+        if limit is None:
+            limit = max(self.consultation_count(patient, severity), 1)
+        return self.consultation_page(patient, severity, order, limit=limit)[0]
+
+    def iter_consultations(self, patient: str, order: str = "oldest", chunk_rows: int = 500) -> Iterator[List[Dict]]:
+        """Every record of one patient, `chunk_rows` at a time, for exports."""
+        cursor = None
+        while True:
+            records, cursor = self.consultation_page(patient, order=order, after=cursor, limit=chunk_rows)
+            if records:
+                yield records
+            if cursor is None:
+                return
+
+    def consultation_count(self, patient: str, severity: Optional[str] = None) -> int:
+        """Records of one patient, optionally of one severity, from the trigger-maintained counts."""
+        with self.pool.connection() as db:
+            if severity is None:
+                row = db.execute("SELECT SUM(count) FROM consultation_counts WHERE patient = ?", (patient,)).fetchone()
+            else:
+                row = db.execute("SELECT count FROM consultation_counts WHERE patient = ? AND severity = ?",
+                                 (patient, severity)).fetchone()
+        return int(row[0]) if row and row[0] else 0
+
+    def mean_confidence(self, patient: str) -> Optional[float]:
+        """Average confidence of the patient's consultations, or None without any."""
+        with self.pool.connection() as db:
+            count, total = db.execute(
+                "SELECT SUM(count), SUM(confidence_total) FROM consultation_counts WHERE patient = ?",
+                (patient,)).fetchone()
+        return total / count if count else None
+
+    def clear_consultations(self, patient: str) -> None:
+        with self.pool.connection() as db:
+            db.execute("DELETE FROM consultations WHERE patient = ?", (patient,))
+
+    # ----- medications -----
+
+    def add_medication(self, patient: str, entry: Mapping) -> bool:
+        """Add a medication ({name, ...}) to the patient's list; False when it is already there."""
+        with self.pool.connection() as db:
+            cur = db.execute(
+                "INSERT OR IGNORE INTO medications (patient, name, added_date, entry) VALUES (?, ?, ?, ?)",
+                (patient, entry["name"], entry.get("added_date", ""), json.dumps(entry)))
+            return cur.rowcount > 0
+
+    def medications(self, patient: str) -> List[Dict]:
+        """The patient's medication list, in the order the entries were added."""
+        with self.pool.connection() as db:
+            return [json.loads(row[0]) for row in db.execute(
+                "SELECT entry FROM medications WHERE patient = ? ORDER BY id", (patient,))]
+
+    def medication_count(self, patient: str) -> int:
+        with self.pool.connection() as db:
+            return db.execute("SELECT COUNT(*) FROM medications WHERE patient = ?", (patient,)).fetchone()[0]
+
+    def clear_medications(self, patient: str) -> None:
+        with self.pool.connection() as db:
+            db.execute("DELETE FROM medications WHERE patient = ?", (patient,))
+
+    # ----- appointments -----
+
+    def add_appointment(self, patient: str, entry: Mapping) -> int:
+        """Store an appointment ({date: 'YYYY-MM-DD', time: 'HH:MM', ...}); returns its id."""
+        with self.pool.connection() as db:
+            cur = db.execute("INSERT INTO appointments (patient, date, entry) VALUES (?, ?, ?)",
+                             (patient, f"{entry.get('date', '')} {entry.get('time', '')}".strip(), json.dumps(entry)))
+            return cur.lastrowid
+
+    def appointments(self, patient: str, limit: Optional[int] = None) -> List[Dict]:
+        """The patient's appointments, most recently scheduled first."""
+        with self.pool.connection() as db:
+            return [json.loads(row[0]) for row in db.execute(
+                "SELECT entry FROM appointments WHERE patient = ? ORDER BY id DESC LIMIT ?",
+                (patient, -1 if limit is None else limit))]
+
+    def appointment_count(self, patient: str) -> int:
+        with self.pool.connection() as db:
+            return db.execute("SELECT COUNT(*) FROM appointments WHERE patient = ?", (patient,)).fetchone()[0]
+
+    # ----- lab panels and goals -----
+
+    def add_lab_panel(self, patient: str, date: str, abnormalities: int) -> None:
+        """Log one Lab Results analysis (the values themselves go to the lab history)."""
+        with self.pool.connection() as db:
+            db.execute("INSERT INTO lab_panels (patient, date, abnormalities) VALUES (?, ?, ?)",
+                       (patient, date, abnormalities))
+
+    def lab_panel_count(self, patient: str) -> int:
+        with self.pool.connection() as db:
+            return db.execute("SELECT COUNT(*) FROM lab_panels WHERE patient = ?", (patient,)).fetchone()[0]
+
+    def goals(self, patient: str) -> Dict:
+        """The patient's saved health goals ({} when none are saved)."""
+        with self.pool.connection() as db:
+            row = db.execute("SELECT goals FROM health_goals WHERE patient = ?", (patient,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def set_goals(self, patient: str, goals: Mapping) -> None:
+        with self.pool.connection() as db:
+            db.execute("INSERT OR REPLACE INTO health_goals (patient, goals) VALUES (?, ?)",
+                       (patient, json.dumps(goals)))
+
+    def close(self) -> None:
+        self.pool.close()
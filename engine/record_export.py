@@ -0,0 +1,108 @@
+"""
+Chunked exports of a patient's consultation records.
+
+Records are read from the patient store in chunks and written straight to a
+spooled temporary file (in memory up to SPOOL_BYTES, on disk beyond), so
+building an export never holds the whole history as Python objects.
+
+Limit: the download is not streamed. Streamlit's download_button turns
+whatever its data callable returns (bytes or a file object) into one bytes
+object held by its media file manager, so export_bytes() reads the finished
+file back whole and the app holds the full encoded export in memory while it
+is being downloaded. Very large histories are better exported with
+write_export() to a file outside the app.
+Formats:
+    json.gz  the {"patient_id", "export_date", "records": [...]} document, gzip-compressed
+    ndjson   one record per line
+    parquet  one row per record, written a row group per chunk (needs pyarrow)
+"""
+
+import gzip
+import importlib.util
+import io
+import json
+import tempfile
+from datetime import datetime
+from typing import BinaryIO, Dict, Optional
+
+from .patient_store import PatientStore
+
+EXPORT_CHUNK_ROWS = 500
+SPOOL_BYTES = 8 * 1024 * 1024
+
+# format -> (label, file extension, MIME type)
+EXPORT_FORMATS = {
+    "json.gz": ("JSON (gzip)", "json.gz", "application/gzip"),
+    "ndjson": ("NDJSON", "ndjson", "application/x-ndjson"),
+    "parquet": ("Parquet", "parquet", "application/vnd.apache.parquet"),
+}
+
+# Parquet columns of a consultation record; other keys are left out, missing ones are null
+PARQUET_COLUMNS = (
+    ("date", "string"), ("symptoms", "string"), ("diagnosis", "string"), ("top_3", "list<string>"),
+    ("confidence", "float64"), ("severity", "string"), ("duration", "string"), ("onset", "string"),
+    ("age", "int64"), ("gender", "string"), ("temperature", "float64"), ("pain_scale", "int64"),
+)
+
+
+def parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def available_export_formats() -> Dict[str, tuple]:
+    """EXPORT_FORMATS without Parquet when pyarrow is not installed."""
+    return {fmt: spec for fmt, spec in EXPORT_FORMATS.items() if fmt != "parquet" or parquet_available()}
+
+
+def write_export(store: PatientStore, patient: str, fmt: str, out: BinaryIO,
+                 exported_at: Optional[datetime] = None, chunk_rows: int = EXPORT_CHUNK_ROWS) -> int:
+    """Write every record of `patient` (oldest first) to `out` in `fmt`; returns the record count."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format {fmt!r}; expected one of {sorted(EXPORT_FORMATS)}")
+    chunks = store.iter_consultations(patient, chunk_rows=chunk_rows)
+    if fmt == "parquet":
+        return _write_parquet(chunks, out)
+    count = 0
+    if fmt == "ndjson":
+        for records in chunks:
+            out.write("".join(json.dumps(record) + "\n" for record in records).encode("utf-8"))
+            count += len(records)
+        return count
+
+    exported_at = exported_at or datetime.now()
+    with gzip.GzipFile(fileobj=out, mode="wb", mtime=0) as gz:
+        text = io.TextIOWrapper(gz, encoding="utf-8")
+        text.write(json.dumps({"patient_id": patient, "export_date": exported_at.isoformat()})[:-1]
+                   + ', "records": [')
+        for records in chunks:
+            text.write(("," if count else "") + "\n  " + ",\n  ".join(json.dumps(record) for record in records))
+            count += len(records)
+        text.write("\n]}\n")
+        text.flush()
+        text.detach()
+    return count
+
+
+def _write_parquet(chunks, out: BinaryIO) -> int:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {"string": pa.string(), "float64": pa.float64(), "int64": pa.int64(), "list<string>": pa.list_(pa.string())}
+    schema = pa.schema([(name, types[kind]) for name, kind in PARQUET_COLUMNS])
+    count = 0
+    with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+        for records in chunks:
+            writer.write_table(pa.Table.from_pylist(records, schema=schema))
+            count += len(records)
+    return count
+
+
+def export_bytes(store: PatientStore, patient: str, fmt: str) -> bytes:
+    """
+    The whole encoded export as bytes, built only when called (e.g. by a
+    download button). Memory use is the size of the export; see the module note.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as out:
+        write_export(store, patient, fmt, out)
+        out.seek(0)
+        return out.read()
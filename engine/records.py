@@ -0,0 +1,90 @@
+"""Consultation records produced from a diagnosis run."""
+
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional
+
+ENGINE_NAME = "Jaccard Similarity v4.0"
+DISCLAIMER = ("AI-generated preliminary diagnostic insight only. "
+              "Not a substitute for professional medical advice, diagnosis, or treatment.")
+
+
+def diagnosis_record(
+    selected_symptoms: List[str],
+    top_results: List[Dict],
+    severity: str,
+    duration: str,
+    onset: str,
+    age: int,
+    gender: str,
+    temperature: float,
+    pain_scale: int = 0,
+    date: Optional[str] = None
+) -> Dict:
+    """Build the medical-history record saved after each Symptom Analyzer run."""
+    primary = top_results[0] if top_results else None
+    return {
+        "date": date or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "symptoms": ", ".join(selected_symptoms),
+        "diagnosis": primary["disease"] if primary else "Undifferentiated",
+        "top_3": [r["disease"] for r in top_results],
+        "confidence": primary["confidence"] if primary else 50,
+        "severity": severity, "duration": duration, "onset": onset,
+        "age": age, "gender": gender, "temperature": temperature, "pain_scale": pain_scale,
+    }
+
+
+def diagnosis_report(
+    selected_symptoms: List[str],
+    top_results: List[Dict],
+    age: int,
+    gender: str,
+    pregnancy: str,
+    severity: str,
+    duration: str,
+    onset: str,
+    temperature: float,
+    pain_scale: int,
+    pmh: Mapping[str, bool],
+    now: Optional[datetime] = None
+) -> Dict:
+    """Build the downloadable diagnostic report (JSON-ready) for one Symptom Analyzer run."""
+    now = now or datetime.now()
+    return {
+        "report_id": f"DX-{now.strftime('%Y%m%d%H%M%S')}",
+        "generated": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "engine": ENGINE_NAME,
+        "patient": {"age": age, "gender": gender, "pregnancy": pregnancy},
+        "presentation": {
+            "symptoms": selected_symptoms, "duration": duration,
+            "onset": onset, "severity": severity, "temperature_F": temperature, "pain": pain_scale
+        },
+        "top_3_differentials": [
+            {"rank": i+1, "disease": r["disease"], "confidence_pct": r["confidence"],
+             "jaccard_score": round(r["jaccard"], 4), "icd_10": r["info"].get("icd_10", "N/A")}
+            for i, r in enumerate(top_results)
+        ],
+        "pmh": dict(pmh),
+        "disclaimer": DISCLAIMER
+    }
+
+
+def report_text(report: Dict) -> str:
+    """Plain-text rendering of a diagnosis_report."""
+    patient, presentation = report["patient"], report["presentation"]
+    txt = f"""MEDICARE AI PRO — CLINICAL DIAGNOSTIC REPORT
+{'='*60}
+Report ID: {report['report_id']}
+Engine: {report['engine']}
+Generated: {report['generated']}
+
+PATIENT: Age {patient['age']}, {patient['gender']}
+SYMPTOMS: {', '.join(presentation['symptoms'])}
+SEVERITY: {presentation['severity']} | DURATION: {presentation['duration']} | TEMP: {presentation['temperature_F']}°F
+
+TOP 3 DIFFERENTIAL DIAGNOSES
+{'='*60}
+"""
+    for r in report["top_3_differentials"]:
+        txt += f"{r['rank']}. {r['disease']} — {r['confidence_pct']}% confidence (Jaccard: {r['jaccard_score']:.4f}) [{r['icd_10']}]\n"
+    txt += f"\n{'='*60}\nDISCLAIMER: {report['disclaimer']}\n"
+    return txt
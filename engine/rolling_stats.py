@@ -0,0 +1,161 @@
+"""
+Incremental statistics for vitals: running moments that merge and subtract in
+constant time (Welford's update, Chan's parallel combination), and a sliding
+window of daily buckets built on them.
+
+A WindowStats holds one Moments per day plus the window total. Appending a
+day adds it to the total, the days falling out of the window are subtracted,
+and min/max come from monotonic queues, so count, mean, standard deviation,
+extremes and the first-week/last-week trend are read in constant time however
+long the history behind the window is.
+"""
+
+import math
+from collections import deque
+from typing import Dict, Optional
+
+DAY_SECONDS = 86400
+
+
+class Moments:
+    """Count, mean, sum of squared deviations, min and max of a set of values."""
+
+    __slots__ = ("count", "mean", "m2", "low", "high")
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0,
+                 low: float = math.inf, high: float = -math.inf):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.low = low
+        self.high = high
+
+    @classmethod
+    def from_sums(cls, count: int, total: float, squares: float, low: float, high: float) -> "Moments":
+        """Moments of `count` values with the given sum and sum of squares."""
+        if not count:
+            return cls()
+        mean = total / count
+        return cls(count, mean, max(squares - total * mean, 0.0), low, high)
+
+    def copy(self) -> "Moments":
+        return Moments(self.count, self.mean, self.m2, self.low, self.high)
+
+    def add(self, value: float) -> None:
+        """Include one value (Welford)."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.low = min(self.low, value)
+        self.high = max(self.high, value)
+
+    def merge(self, other: "Moments") -> None:
+        """Include every value of `other` (Chan et al.)."""
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.low = min(self.low, other.low)
+        self.high = max(self.high, other.high)
+
+    def remove(self, other: "Moments") -> None:
+        """
+        Exclude the values of `other`, which must have been merged in. low and
+        high are left as they were: they cannot be undone, see WindowStats.
+        """
+        count = self.count - other.count
+        if count <= 0:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        mean = (self.count * self.mean - other.count * other.mean) / count
+        delta = other.mean - mean
+        self.m2 = max(self.m2 - other.m2 - delta * delta * count * other.count / self.count, 0.0)
+        self.mean = mean
+        self.count = count
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (n - 1 denominator, like pandas), NaN below two values."""
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class WindowStats:
+    """
+    Statistics of the last `days` daily buckets up to the latest one. Buckets
+    are fed in time order with update(); the latest bucket may be fed again
+    (with all of its values) as more samples land in it.
+    """
+
+    def __init__(self, days: int, trend_days: int = 7):
+        self.days = days
+        self.trend_days = trend_days
+        self.total = Moments()
+        self._buckets = deque()   # (bucket start, Moments), oldest first
+        self._lows = deque()      # (bucket start, low), lows increasing
+        self._highs = deque()     # (bucket start, high), highs decreasing
+
+    @property
+    def latest(self) -> Optional[int]:
+        return self._buckets[-1][0] if self._buckets else None
+
+    def update(self, bucket: int, moments: Moments) -> None:
+        """
+        Set the values of the day starting at `bucket` (epoch seconds). Raises
+        ValueError for a day before the latest one; rebuild the window then.
+        """
+        latest = self.latest
+        if latest is not None and bucket < latest:
+            raise ValueError(f"bucket {bucket} is older than the latest bucket {latest}")
+        if bucket == latest:
+            _, previous = self._buckets.pop()
+            self.total.remove(previous)
+            while self._lows and self._lows[-1][0] == bucket:
+                self._lows.pop()
+            while self._highs and self._highs[-1][0] == bucket:
+                self._highs.pop()
+        if not moments.count:
+            return
+        self._buckets.append((bucket, moments))
+        self.total.merge(moments)
+        while self._lows and self._lows[-1][1] >= moments.low:
+            self._lows.pop()
+        self._lows.append((bucket, moments.low))
+        while self._highs and self._highs[-1][1] <= moments.high:
+            self._highs.pop()
+        self._highs.append((bucket, moments.high))
+
+        first = bucket - (self.days - 1) * DAY_SECONDS
+        while self._buckets[0][0] < first:
+            self.total.remove(self._buckets.popleft()[1])
+        while self._lows[0][0] < first:
+            self._lows.popleft()
+        while self._highs[0][0] < first:
+            self._highs.popleft()
+
+    def _edge_mean(self, newest: bool) -> float:
+        edge = Moments()
+        count = min(self.trend_days, len(self._buckets))
+        for i in range(count):
+            edge.merge(self._buckets[-1 - i if newest else i][1])
+        return edge.mean if edge.count else math.nan
+
+    def summary(self) -> Dict[str, float]:
+        """count, mean, std, min, max, and the mean of the first and last `trend_days` days."""
+        empty = not self.total.count
+        return {
+            "count": self.total.count,
+            "mean": math.nan if empty else self.total.mean,
+            "std": self.total.std,
+            "min": math.nan if empty else self._lows[0][1],
+            "max": math.nan if empty else self._highs[0][1],
+            "first_mean": self._edge_mean(newest=False),
+            "last_mean": self._edge_mean(newest=True),
+        }
@@ -0,0 +1,308 @@
+"""Vectorized Jaccard similarity engine for differential diagnosis."""
+
+import hashlib
+import json
+from functools import cached_property
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .cache import DiagnosisCache, result_key
+from .knowledge_base import MedicalDatabase
+from .modifiers import ModifierTable, encounter_context
+from .timing import NULL_TIMER, StageTimer
+from .vocabulary import SYMPTOM_CATEGORIES, SymptomVocabulary, build_vocabulary
+
+# ==================== JACCARD SIMILARITY ENGINE ====================
+
+
+def compute_jaccard_similarity(symptom_set_a: frozenset, symptom_set_b: frozenset) -> float:
+    """Compute Jaccard similarity coefficient between two symptom sets."""
+    if not symptom_set_a and not symptom_set_b:
+        return 0.0
+    intersection = len(symptom_set_a & symptom_set_b)
+    union = len(symptom_set_a | symptom_set_b)
+    return intersection / union if union > 0 else 0.0
+
+
+class SymptomMatrix:
+    """
+    Disease symptom profiles compiled once over the shared symptom vocabulary
+    (rows follow the knowledge-base order): a symptom → disease posting-list
+    index for single queries, a 0/1 matrix for batch scoring, and the clinical
+    modifier table compiled into per-disease weight vectors.
+    """
+
+    def __init__(self, diseases: Mapping[str, Mapping], vocabulary: SymptomVocabulary):
+        self.vocabulary = vocabulary
+        self.names: List[str] = list(diseases)
+        self.records: List[Mapping] = [diseases[name] for name in self.names]
+
+        rows, cols = [], []
+        for row, data in enumerate(self.records):
+            for sym in data.get("symptom_set", frozenset()):
+                rows.append(row)
+                cols.append(vocabulary.ids[sym])
+        rows = np.array(rows, dtype=np.int64)
+        cols = np.array(cols, dtype=np.int64)
+        self.sizes = np.bincount(rows, minlength=len(self.names)).astype(np.int64)
+
+        # Posting lists in CSR form: diseases having symptom s are
+        # postings[posting_offsets[s]:posting_offsets[s + 1]], in knowledge-base order
+        by_symptom = np.argsort(cols, kind="stable")
+        self.postings = rows[by_symptom]
+        self.posting_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cols, minlength=len(vocabulary)), out=self.posting_offsets[1:])
+
+        severities = [data.get("severity", "") for data in self.records]
+        self.modifier_table = ModifierTable.compile(self.names, severities)
+
+        # Changes whenever anything that affects scores or their order changes
+        profiles = [sorted(data.get("symptom_set", frozenset())) for data in self.records]
+        self.signature = hashlib.sha256(json.dumps(
+            [vocabulary.names, self.names, profiles, severities, self.modifier_table.signature]).encode()).hexdigest()
+
+    @cached_property
+    def matrix(self) -> np.ndarray:
+        """Dense (diseases × symptoms) 0/1 matrix, built on first batch use."""
+        matrix = np.zeros((len(self.names), len(self.vocabulary)), dtype=np.float32)
+        symptoms = np.repeat(np.arange(len(self.vocabulary)), np.diff(self.posting_offsets))
+        matrix[self.postings, symptoms] = 1.0
+        return matrix
+
+    def candidates(self, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Diseases sharing at least one of the symptom ids, with the size of each
+        intersection, from a merge of the matching posting lists.
+        """
+        lists = [self.postings[self.posting_offsets[s]:self.posting_offsets[s + 1]] for s in ids]
+        if not lists:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(lists), return_counts=True)
+
+    @classmethod
+    def compile(cls, diseases: Mapping[str, Mapping]) -> "SymptomMatrix":
+        vocabulary = build_vocabulary(
+            SYMPTOM_CATEGORIES, (data.get("symptom_set", frozenset()) for data in diseases.values()))
+        return cls(diseases, vocabulary)
+
+    def score_bounds(self, query_size: int, diseases: np.ndarray) -> np.ndarray:
+        """
+        Best score each disease could reach for a query of this size, even with a
+        perfect match: min(|A|,|B|) / max(|A|,|B|) × max_modifier, capped at 1.
+        """
+        sizes = self.sizes[diseases]
+        largest = np.maximum(sizes, query_size)
+        jaccard_bound = np.divide(np.minimum(sizes, query_size), largest,
+                                  out=np.zeros(len(sizes)), where=largest > 0)
+        return np.minimum(jaccard_bound * self.modifier_table.max_modifier[diseases], 1.0)
+
+
+_SYMPTOM_MATRIX: Optional[SymptomMatrix] = None
+
+
+def symptom_matrix() -> SymptomMatrix:
+    """Process-wide compiled matrix for MedicalDatabase.DISEASES, built on first use."""
+    global _SYMPTOM_MATRIX
+    if _SYMPTOM_MATRIX is None:
+        _SYMPTOM_MATRIX = SymptomMatrix.compile(MedicalDatabase.DISEASES)
+    return _SYMPTOM_MATRIX
+
+
+def _score(compiled: SymptomMatrix, columns, matched: np.ndarray, query_sizes: np.ndarray,
+           modifier: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Weighted Jaccard score, raw Jaccard and confidence for a block of (encounter, disease) cells."""
+    sizes = compiled.sizes[columns]
+    union = sizes + query_sizes[:, None] - matched
+    jaccard = np.divide(matched, union, out=np.zeros(union.shape), where=union > 0)
+    final_score = np.minimum(jaccard * modifier, 1.0)
+
+    # Convert to confidence %: 50-95% range
+    coverage = np.divide(matched, sizes, out=np.zeros(union.shape), where=sizes > 0)
+    confidence = np.clip((45 + (final_score * 35) + (coverage * 20)).astype(np.int64), 30, 96)
+    return final_score, jaccard, confidence
+
+
+def _top_k_order(ranking: np.ndarray, k: int) -> np.ndarray:
+    """
+    Column order of each row's k smallest ranking values, ties broken by column
+    index (what a stable sort would give) without sorting whole rows.
+    """
+    rows, cols = ranking.shape
+    if k >= cols:
+        return np.argsort(ranking, axis=1, kind="stable")
+    kth = np.take_along_axis(ranking, np.argpartition(ranking, k - 1, axis=1)[:, k - 1:k], axis=1)
+    better = ranking < kth
+    tied = ranking == kth
+    needed = k - better.sum(axis=1, keepdims=True)
+    keep = better | (tied & (np.cumsum(tied, axis=1) <= needed))
+    picked = np.nonzero(keep)[1].reshape(rows, k)
+    return np.take_along_axis(
+        picked, np.argsort(np.take_along_axis(ranking, picked, axis=1), axis=1, kind="stable"), axis=1)
+
+
+def _result_dicts(compiled: SymptomMatrix, diseases: List[int], score: List[float], confidence: List[int],
+                  jaccard: List[float], matched: List[int], modifier: List[float]) -> List[Dict]:
+    return [{
+        "disease": compiled.names[i],
+        "score": score[k],
+        "confidence": confidence[k],
+        "jaccard": jaccard[k],
+        "symptoms_matched": matched[k],
+        "total_disease_symptoms": int(compiled.sizes[i]),
+        "modifier": modifier[k],
+        "info": compiled.records[i]
+    } for k, i in enumerate(diseases)]
+
+
+# Candidates scored in the first step of the pruned top-k search (later steps double)
+PRUNE_BLOCK = 1024
+
+
+def get_top_diagnoses(
+    selected_symptoms: List[str],
+    age: int,
+    gender: str,
+    temperature: float,
+    severity: str,
+    onset: str,
+    duration: str,
+    top_n: int = 3,
+    pmh: Optional[Mapping[str, bool]] = None,
+    compiled: Optional[SymptomMatrix] = None,
+    cache: Optional[DiagnosisCache] = None,
+    timer: Optional[StageTimer] = None
+) -> List[Dict]:
+    """
+    Return top-N differential diagnoses ranked by weighted Jaccard similarity.
+    Applies the clinical modifier table (temperature, severity, onset, age,
+    gender, duration and past-medical-history flags in `pmh`). Scores against
+    `compiled`, or the process-wide symptom_matrix() when omitted. With a
+    `cache`, repeated requests reuse the ranked result; a `timer` records how
+    long each pipeline stage took.
+
+    Candidates are visited in order of their best reachable score and the
+    search stops once no remaining disease could beat the current N-th best,
+    so scoring work grows with the number of real candidates.
+    """
+    compiled = compiled or symptom_matrix()
+    timer = timer or NULL_TIMER
+    table = compiled.modifier_table
+    with timer.stage("vectorize"):
+        selected_set = frozenset(selected_symptoms)
+        ids, unknown = compiled.vocabulary.encode(selected_set)
+        query_size = np.array([len(selected_set)])
+        fired = table.fired(encounter_context(
+            {name: [name in selected_set] for name in table.symptoms}, [age], [gender], [temperature],
+            [severity], [onset], [duration], {field: [flag] for field, flag in (pmh or {}).items()}))
+        key = result_key(compiled.signature, ids, unknown, fired, top_n) if cache is not None else None
+        ranked_result = cache.get(key) if cache is not None else None
+
+    if ranked_result is None:
+        ranked_result = _ranked_search(compiled, ids, query_size, fired, top_n, timer)
+        if cache is not None:
+            cache.put(key, ranked_result)
+    with timer.stage("report"):
+        return _result_dicts(compiled, *ranked_result)
+
+
+def _ranked_search(compiled: SymptomMatrix, ids: np.ndarray, query_size: np.ndarray, fired: np.ndarray,
+                   top_n: int, timer) -> Tuple[List, ...]:
+    """Pruned top-N search for one encounter; returns the ranked rows and their score columns."""
+    with timer.stage("score"):
+        # Real candidates share at least one symptom; everything else scores 0
+        candidates, overlap = compiled.candidates(ids)
+        bounds = compiled.score_bounds(int(query_size[0]), candidates)
+        by_bound = np.argsort(-bounds, kind="stable")
+        order, overlap, bounds = candidates[by_bound], overlap[by_bound], bounds[by_bound]
+
+    kept: List[np.ndarray] = []
+    kth_best = 0.05
+    start, step = 0, PRUNE_BLOCK
+    while start < len(order):
+        # Bounds are sorted: once one cannot beat the N-th best (or clear the 0.05 floor), none can
+        if top_n <= 0 or bounds[start] < kth_best or bounds[start] <= 0.05:
+            break
+        block = order[start:start + step]
+        matched = overlap[start:start + step].astype(np.int64)[None, :]
+        start, step = start + step, step * 2
+        with timer.stage("modify"):
+            modifier = compiled.modifier_table.modifiers(fired, block)
+        with timer.stage("score"):
+            final_score, jaccard, confidence = _score(compiled, block, matched, query_size, modifier)
+        with timer.stage("rank"):
+            hit = final_score[0] > 0.05
+            kept.append(np.stack([block[hit], final_score[0, hit], jaccard[0, hit],
+                                  confidence[0, hit], matched[0, hit], modifier[0, hit]]))
+            scores = np.concatenate([k[1] for k in kept])
+            if len(scores) >= top_n:
+                kth_best = max(kth_best, np.partition(scores, len(scores) - top_n)[len(scores) - top_n])
+
+    with timer.stage("rank"):
+        if not kept:
+            return [], [], [], [], [], []
+        disease, final_score, jaccard, confidence, matched, modifier = np.concatenate(kept, axis=1)
+        disease = disease.astype(np.int64)
+        # Highest score first; knowledge-base order between equal scores
+        ranked = np.lexsort((disease, -final_score))[:top_n]
+        return (disease[ranked].tolist(), final_score[ranked].tolist(),
+                confidence[ranked].astype(np.int64).tolist(), jaccard[ranked].tolist(),
+                matched[ranked].astype(np.int64).tolist(), modifier[ranked].tolist())
+
+
+# Cells (encounters × diseases) scored per block; bounds batch working memory
+BATCH_BLOCK_CELLS = 2_000_000
+
+
+def get_top_diagnoses_batch(
+    encounter_symptoms: Sequence[Iterable[str]],
+    ages: Sequence[float],
+    genders: Sequence[str],
+    temperatures: Sequence[float],
+    severities: Sequence[str],
+    onsets: Sequence[str],
+    durations: Sequence[str],
+    top_n: int = 3,
+    pmh: Optional[Mapping[str, Sequence[bool]]] = None,
+    compiled: Optional[SymptomMatrix] = None
+) -> List[List[Dict]]:
+    """
+    Batch form of get_top_diagnoses: one list of differentials per encounter.
+    Encounters are encoded into a query matrix and scored block-wise with a
+    single matrix product per block, giving the same results as calling
+    get_top_diagnoses on each encounter.
+    """
+    compiled = compiled or symptom_matrix()
+    count = len(encounter_symptoms)
+    query = np.zeros((count, len(compiled.vocabulary)), dtype=np.float32)
+    query_sizes = np.zeros(count, dtype=np.int64)
+    for row, symptoms in enumerate(encounter_symptoms):
+        selected_set = frozenset(symptoms)
+        ids, _ = compiled.vocabulary.encode(selected_set)
+        query[row, ids] = 1.0
+        query_sizes[row] = len(selected_set)
+
+    table = compiled.modifier_table
+    reported = {name: query[:, compiled.vocabulary.ids[name]] > 0 if name in compiled.vocabulary
+                else np.zeros(count, dtype=bool) for name in table.symptoms}
+    fired = table.fired(encounter_context(
+        reported, ages, genders, temperatures, severities, onsets, durations, pmh))
+
+    block = max(1, BATCH_BLOCK_CELLS // max(len(compiled.names), 1))
+    k = min(max(top_n, 0), len(compiled.names))
+    results: List[List[Dict]] = []
+    for start in range(0, count, block):
+        rows = slice(start, start + block)
+        matched = (query[rows] @ compiled.matrix.T).astype(np.int64)
+        modifier = table.modifiers(fired[:, rows])
+        final_score, jaccard, confidence = _score(compiled, slice(None), matched, query_sizes[rows], modifier)
+
+        # Excluded cells rank last; argpartition keeps selection linear in the catalogue size
+        ranking = np.where(final_score > 0.05, -final_score, np.inf)
+        order = _top_k_order(ranking, k) if k else np.zeros((len(ranking), 0), dtype=np.int64)
+        picked = [np.take_along_axis(values, order, axis=1).tolist()
+                  for values in (final_score, confidence, jaccard, matched, modifier)]
+        for r, cols in enumerate(order.tolist()):
+            n = sum(1 for s in picked[0][r] if s > 0.05)
+            results.append(_result_dicts(compiled, cols[:n], *(values[r][:n] for values in picked)))
+    return results
@@ -0,0 +1,292 @@
+"""
+Long-horizon storage for vitals time series, with rollups and chart
+downsampling.
+
+Raw samples (subject, metric, ts, value) live in an SQLite WITHOUT ROWID
+table clustered on that key. Hourly and daily rollups (count, sum, min, max
+per bucket) are kept next to them and refreshed for the buckets each write
+touches. A chart query reads the finest level that keeps the fetch small (raw
+samples, then hourly, then daily buckets) and reduces it to at most
+MAX_POINTS with LTTB or min/max per bucket. A five-year view of minute-level
+data costs about as much to fetch and draw as a 90-day view. Summary
+statistics over a trailing window of days are kept up to date from the daily
+rollups as samples arrive (see engine.rolling_stats).
+"""
+
+import sqlite3
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .rolling_stats import DAY_SECONDS, Moments, WindowStats
+
+# Rollup bucket widths in seconds, finest first
+ROLLUP_SECONDS = (3600, DAY_SECONDS)
+# Points per trace sent to a chart
+MAX_POINTS = 2000
+# Largest number of rows a chart query reads before falling back to a coarser level
+FETCH_LIMIT = 20 * MAX_POINTS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vitals_raw (
+    subject TEXT    NOT NULL,
+    metric  TEXT    NOT NULL,
+    ts      INTEGER NOT NULL,  -- seconds since the epoch
+    value   REAL    NOT NULL,
+    PRIMARY KEY (subject, metric, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS vitals_rollup (
+    subject    TEXT    NOT NULL,
+    metric     TEXT    NOT NULL,
+    resolution INTEGER NOT NULL,  -- bucket width in seconds
+    bucket     INTEGER NOT NULL,  -- bucket start, seconds since the epoch
+    count      INTEGER NOT NULL,
+    total      REAL    NOT NULL,
+    squares    REAL    NOT NULL,  -- sum of squared values
+    low        REAL    NOT NULL,
+    high       REAL    NOT NULL,
+    PRIMARY KEY (subject, metric, resolution, bucket)
+) WITHOUT ROWID;
+"""
+
+Series = Tuple[np.ndarray, np.ndarray]
+
+
+def _epoch_seconds(times) -> np.ndarray:
+    times = np.asarray(times)
+    if np.issubdtype(times.dtype, np.datetime64):
+        return times.astype("datetime64[s]").astype(np.int64)
+    return times.astype(np.int64)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Indices of the points Largest-Triangle-Three-Buckets keeps: the first and
+    last point, plus from each of threshold - 2 buckets the point forming the
+    largest triangle with the previous pick and the next bucket's average.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    xf = x.astype(float)
+    yf = y.astype(float)
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    picks = np.empty(threshold, dtype=np.int64)
+    picks[0], picks[-1] = 0, n - 1
+    previous = 0
+    for b in range(threshold - 2):
+        lo, hi = edges[b], edges[b + 1]
+        next_hi = edges[b + 2] if b + 2 < len(edges) else n
+        avg_x = xf[hi:next_hi].mean() if next_hi > hi else xf[-1]
+        avg_y = yf[hi:next_hi].mean() if next_hi > hi else yf[-1]
+        area = np.abs((xf[previous] - avg_x) * (yf[lo:hi] - yf[previous])
+                      - (xf[previous] - xf[lo:hi]) * (avg_y - yf[previous]))
+        previous = lo + int(area.argmax())
+        picks[b + 1] = previous
+    return picks
+
+
+def minmax(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the lowest and highest point of each of threshold // 2 equal-count buckets, in time order."""
+    n = len(x)
+    if threshold >= n or threshold < 2:
+        return np.arange(n)
+    buckets = threshold // 2
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    lows = np.minimum.reduceat(y, starts)
+    highs = np.maximum.reduceat(y, starts)
+    picks = []
+    for b in range(buckets):
+        segment = y[edges[b]:edges[b + 1]]
+        picks.append(edges[b] + int(np.flatnonzero(segment == lows[b])[0]))
+        picks.append(edges[b] + int(np.flatnonzero(segment == highs[b])[0]))
+    return np.unique(picks)
+
+
+DOWNSAMPLERS = {"lttb": lttb, "minmax": minmax}
+
+
+def downsample(x: np.ndarray, y: np.ndarray, max_points: int = MAX_POINTS, method: str = "lttb") -> Series:
+    """At most `max_points` of (x, y), chosen to keep the visual shape."""
+    keep = DOWNSAMPLERS[method](_epoch_seconds(x), y, max_points)
+    return x[keep], y[keep]
+
+
+class TimeSeriesStore:
+    """
+    Vitals samples for any number of subjects and metrics, in an SQLite file
+    (or in memory with the default path). Safe to share between Streamlit
+    sessions; `revision` increases with every write, so caches can key on it.
+    Windows requested through stats() are updated on every write.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.revision = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str, int], WindowStats] = {}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    def add(self, subject: str, metric: str, times, values: Sequence[float]) -> int:
+        """
+        Insert samples (a later value for the same second replaces the earlier
+        one), refresh the rollup buckets they fall in and the window stats of
+        the metric. `times` are
+        datetime64 values or epoch seconds. Returns the number of samples.
+        """
+        ts = _epoch_seconds(times)
+        values = np.asarray(values, dtype=float)
+        keep = ~np.isnan(values)
+        ts, values = ts[keep], values[keep]
+        if not len(ts):
+            return 0
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO vitals_raw (subject, metric, ts, value) VALUES (?, ?, ?, ?)",
+                zip([subject] * len(ts), [metric] * len(ts), ts.tolist(), values.tolist()))
+            first, last = int(ts.min()), int(ts.max())
+            for resolution in ROLLUP_SECONDS:
+                low = first - first % resolution
+                self._db.execute(
+                    "INSERT OR REPLACE INTO vitals_rollup "
+                    "SELECT subject, metric, ?, ts - ts % ?, COUNT(*), SUM(value), SUM(value * value), "
+                    "MIN(value), MAX(value) "
+                    "FROM vitals_raw WHERE subject = ? AND metric = ? AND ts BETWEEN ? AND ? "
+                    "GROUP BY ts - ts % ?",
+                    (resolution, resolution, subject, metric, low, last - last % resolution + resolution - 1,
+                     resolution))
+            self._db.commit()
+            self.revision += 1
+            self._update_stats(subject, metric, first - first % DAY_SECONDS, last)
+        return len(ts)
+
+    def clear(self, subject: str) -> None:
+        """Delete every sample and rollup of one subject."""
+        with self._lock:
+            self._db.execute("DELETE FROM vitals_raw WHERE subject = ?", (subject,))
+            self._db.execute("DELETE FROM vitals_rollup WHERE subject = ?", (subject,))
+            self._db.commit()
+            self.revision += 1
+            self._stats = {key: stats for key, stats in self._stats.items() if key[0] != subject}
+
+    def _daily(self, subject: str, metric: str, start: int, end: int):
+        return self._db.execute(
+            "SELECT bucket, count, total, squares, low, high FROM vitals_rollup "
+            "WHERE subject = ? AND metric = ? AND resolution = ? AND bucket BETWEEN ? AND ? ORDER BY bucket",
+            (subject, metric, DAY_SECONDS, start, end)).fetchall()
+
+    def _build_stats(self, subject: str, metric: str, days: int) -> WindowStats:
+        stats = WindowStats(days)
+        row = self._db.execute(
+            "SELECT MAX(bucket) FROM vitals_rollup WHERE subject = ? AND metric = ? AND resolution = ?",
+            (subject, metric, DAY_SECONDS)).fetchone()
+        if row[0] is not None:
+            for bucket, *sums in self._daily(subject, metric, row[0] - (days - 1) * DAY_SECONDS, row[0]):
+                stats.update(bucket, Moments.from_sums(*sums))
+        return stats
+
+    def _update_stats(self, subject: str, metric: str, first: int, last: int) -> None:
+        """Feed the daily buckets between first and last to the tracked windows of the metric."""
+        for key, stats in self._stats.items():
+            if key[:2] != (subject, metric):
+                continue
+            if stats.latest is not None and first < stats.latest:
+                # Samples landed before the window's latest day: rebuild from the rollups
+                self._stats[key] = self._build_stats(subject, metric, key[2])
+                continue
+            for bucket, *sums in self._daily(subject, metric, first, last):
+                stats.update(bucket, Moments.from_sums(*sums))
+
+    def stats(self, subject: str, metric: str, days: int) -> Dict[str, float]:
+        """
+        Summary of the last `days` days up to the latest sample (see
+        WindowStats.summary) plus `current`, the latest value. The first call
+        for a window reads its daily rollups; later calls and writes cost the
+        same however long the history is.
+        """
+        key = (subject, metric, days)
+        with self._lock:
+            if key not in self._stats:
+                self._stats[key] = self._build_stats(subject, metric, days)
+            summary = self._stats[key].summary()
+        latest = self.latest(subject, metric)
+        summary["current"] = latest[1] if latest else float("nan")
+        return summary
+
+    def latest(self, subject: str, metric: str) -> Optional[Tuple[int, float]]:
+        """(time in epoch seconds, value) of the newest sample, or None."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT ts, value FROM vitals_raw WHERE subject = ? AND metric = ? ORDER BY ts DESC LIMIT 1",
+                (subject, metric)).fetchone()
+
+    def span(self, subject: str, metric: str) -> Optional[Tuple[int, int]]:
+        """(first, last) sample time in epoch seconds, or None when the metric has no samples."""
+        with self._lock:
+            row = self._db.execute("SELECT MIN(ts), MAX(ts) FROM vitals_raw WHERE subject = ? AND metric = ?",
+                                   (subject, metric)).fetchone()
+        return None if row[0] is None else (row[0], row[1])
+
+    def metrics(self, subject: str) -> Dict[str, int]:
+        """{metric: sample count} for one subject."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT metric, SUM(count) FROM vitals_rollup WHERE subject = ? AND resolution = ? GROUP BY metric",
+                (subject, ROLLUP_SECONDS[-1])).fetchall()
+        return dict(rows)
+
+    def rollup(self, subject: str, metric: str, resolution: int, start: int, end: int
+               ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(bucket starts, counts, means, lows, highs) of one rollup level between start and end (epoch seconds)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT bucket, count, total, low, high FROM vitals_rollup "
+                "WHERE subject = ? AND metric = ? AND resolution = ? AND bucket BETWEEN ? AND ? ORDER BY bucket",
+                (subject, metric, resolution, start - start % resolution, end)).fetchall()
+        data = np.array(rows, dtype=float).reshape(-1, 5)
+        counts = data[:, 1].astype(np.int64)
+        return (data[:, 0].astype(np.int64).astype("datetime64[s]"), counts,
+                data[:, 2] / np.maximum(counts, 1), data[:, 3], data[:, 4])
+
+    def window(self, subject: str, metric: str, start: Optional[int] = None, end: Optional[int] = None) -> Series:
+        """
+        (times as datetime64[s], values) between start and end (epoch seconds,
+        default: everything), from the finest level with at most FETCH_LIMIT
+        rows: raw samples, else hourly, else daily bucket means (stamped at
+        the bucket start).
+        """
+        start = -2 ** 62 if start is None else int(start)
+        end = 2 ** 62 if end is None else int(end)
+        with self._lock:
+            counts = [self._db.execute(
+                "SELECT COALESCE(SUM(count), 0), COUNT(*) FROM vitals_rollup "
+                "WHERE subject = ? AND metric = ? AND resolution = ? AND bucket BETWEEN ? AND ?",
+                (subject, metric, resolution, start - start % resolution, end)).fetchone()
+                for resolution in ROLLUP_SECONDS]
+            if counts[0][0] <= FETCH_LIMIT:
+                rows = self._db.execute(
+                    "SELECT ts, value FROM vitals_raw WHERE subject = ? AND metric = ? AND ts BETWEEN ? AND ? "
+                    "ORDER BY ts", (subject, metric, start, end)).fetchall()
+                data = np.array(rows, dtype=float).reshape(-1, 2)
+                return data[:, 0].astype(np.int64).astype("datetime64[s]"), data[:, 1]
+        for resolution, (_, buckets) in zip(ROLLUP_SECONDS, counts):
+            if buckets <= FETCH_LIMIT or resolution == ROLLUP_SECONDS[-1]:
+                times, _, means, _, _ = self.rollup(subject, metric, resolution, start, end)
+                return times, means
+
+    def series(self, subject: str, metric: str, start: Optional[int] = None, end: Optional[int] = None,
+               max_points: int = MAX_POINTS, method: str = "lttb") -> Series:
+        """window() reduced to at most `max_points` points for a chart."""
+        times, values = self.window(subject, metric, start, end)
+        return downsample(times, values, max_points, method)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,76 @@
+"""Monotonic per-stage timing for the diagnosis pipeline."""
+
+import time
+from typing import Callable, Dict, Optional, Sequence
+
+# Pipeline stages in the order they run
+DIAGNOSIS_STAGES = ("vectorize", "score", "modify", "rank", "report")
+
+
+class _Stage:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer: "StageTimer", name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self) -> "_Stage":
+        self.timer._enter(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.timer.seconds[self.name] = self.timer.seconds.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+class StageTimer:
+    """
+    Accumulates wall time per named stage with time.perf_counter. A stage can
+    be entered several times (e.g. once per scoring block); its durations add
+    up. `on_stage(name, index)` is called the first time each stage starts,
+    which is what drives the progress display.
+    """
+
+    def __init__(self, stages: Sequence[str] = DIAGNOSIS_STAGES,
+                 on_stage: Optional[Callable[[str, int], None]] = None):
+        self.stages = tuple(stages)
+        self.on_stage = on_stage
+        self.seconds: Dict[str, float] = {}
+
+    def stage(self, name: str) -> _Stage:
+        return _Stage(self, name)
+
+    def _enter(self, name: str) -> None:
+        if name not in self.seconds:
+            self.seconds[name] = 0.0
+            if self.on_stage is not None:
+                self.on_stage(name, self.stages.index(name) if name in self.stages else len(self.stages))
+
+    def milliseconds(self) -> Dict[str, float]:
+        """Duration of every stage in pipeline order (0.0 for stages that never ran), plus "total"."""
+        ms = {name: self.seconds.get(name, 0.0) * 1000 for name in self.stages}
+        ms.update((name, s * 1000) for name, s in self.seconds.items() if name not in ms)
+        ms["total"] = sum(self.seconds.values()) * 1000
+        return ms
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+class _NullTimer:
+    """Stand-in used when the caller does not ask for timings."""
+
+    _stage = _NullStage()
+
+    def stage(self, name: str) -> _NullStage:
+        return self._stage
+
+
+NULL_TIMER = _NullTimer()
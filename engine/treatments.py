@@ -0,0 +1,49 @@
+"""
+Disease → medication cross-index: every treatment line of every disease
+("Metformin 500–2000mg daily", "Warfarin (INR 2-3)") resolved once, when the
+knowledge base is loaded, to the formulary medications it names by name,
+generic or brand name.
+
+A line naming only a drug class ("Statins for CV protection", "IV antibiotics
+if admitted") links nothing: the formulary member may not be the drug or the
+route the line means. Lines advising against a drug ("Avoid antibiotics unless
+bacterial cause confirmed") link nothing either.
+"""
+
+import re
+from typing import Dict, List, Mapping, Tuple
+
+from .interactions import InteractionIndex
+from .medication_search import split_terms
+
+# (treatment line, medications it names)
+TreatmentLine = Tuple[str, Tuple[str, ...]]
+
+# Words (as lowercase terms) that make a line a caution rather than a prescription
+ADVISORY_WORDS = ("avoid", "unless", "do not", "don t", "never", "stop", "discontinue", "withhold",
+                  "contraindicated")
+_ADVISORY = re.compile(r"\b(?:" + "|".join(ADVISORY_WORDS) + r")\b")
+
+
+def advises_against(line: str) -> bool:
+    """Whether a treatment line warns against, or conditions away, what it names."""
+    return _ADVISORY.search(" ".join(split_terms(line))) is not None
+
+
+def treatment_index(diseases: Mapping[str, Mapping],
+                    interactions: InteractionIndex) -> Dict[str, List[TreatmentLine]]:
+    """
+    disease -> its treatment medication lines, in record order, each with the
+    medications it names directly. Lines naming nothing in the formulary, only
+    a class, or advising against a drug keep an empty tuple.
+    """
+    index = {}
+    for disease, record in diseases.items():
+        treatment = record.get("treatment")
+        lines = treatment.get("medications", ()) if isinstance(treatment, Mapping) else ()
+        resolved = []
+        for line in lines:
+            named = set() if advises_against(line) else interactions.mentions(line)
+            resolved.append((line, tuple(sorted(named & interactions.classes_of.keys()))))
+        index[disease] = resolved
+    return index
@@ -0,0 +1,60 @@
+"""Shared symptom vocabulary: one stable integer id per symptom name."""
+
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+import numpy as np
+
+# ==================== SYMPTOM CATEGORIES ====================
+# Checkbox groups shown in the Symptom Analyzer. Every name here, plus any
+# symptom that only appears in a disease profile, gets an id in the vocabulary.
+SYMPTOM_CATEGORIES: Dict[str, List[str]] = {
+    "🔥 Constitutional": ["Fever", "Fatigue", "Weight Loss", "Chills", "Night Sweats", "Malaise"],
+    "😷 Respiratory": ["Cough", "Shortness of Breath", "Sore Throat", "Runny Nose", "Wheezing", "Chest Tightness", "Nasal Congestion", "Sputum Production"],
+    "🧠 Neurological": ["Headache", "Severe Headache", "Dizziness", "Visual Changes", "Neck Stiffness", "Confusion", "Seizures", "Aura", "Photophobia", "Phonophobia"],
+    "💪 Musculoskeletal": ["Body Aches", "Muscle Weakness", "Back Pain", "Leg Pain", "Joint Pain", "Stiffness"],
+    "🤢 Gastrointestinal": ["Nausea", "Vomiting", "Diarrhea", "Abdominal Pain", "Loss of Appetite", "Bloating", "Cramping"],
+    "❤️ Cardiovascular": ["Chest Pain", "Palpitations", "Leg Swelling", "Syncope", "Irregular Heartbeat", "Arm Pain", "Jaw Pain"],
+    "🌡️ Systemic": ["Sweating", "Rash", "Dehydration", "Blood in Urine", "Painful Urination", "Frequent Urination", "Blurred Vision", "Numbness", "Slow Healing", "Increased Thirst", "Increased Hunger"],
+    "🔴 Emergency": ["Rebound Tenderness", "Rigidity", "Petechial Rash", "Limb Ischemia"]
+}
+
+
+class SymptomVocabulary:
+    """Ordered symptom names with a name → id lookup."""
+
+    def __init__(self, names: Iterable[str]):
+        self.names: Tuple[str, ...] = tuple(dict.fromkeys(names))
+        self.ids: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.ids
+
+    def encode(self, symptoms: Iterable[str]) -> Tuple[np.ndarray, int]:
+        """
+        Map symptom names to sorted unique ids.
+        Returns (ids, unknown) where unknown counts names outside the vocabulary;
+        they match no disease but still widen the Jaccard union.
+        """
+        ids = set()
+        unknown = set()
+        for name in symptoms:
+            idx = self.ids.get(name)
+            if idx is None:
+                unknown.add(name)
+            else:
+                ids.add(idx)
+        return np.array(sorted(ids), dtype=np.intp), len(unknown)
+
+
+def build_vocabulary(
+    categories: Mapping[str, List[str]],
+    symptom_sets: Iterable[Iterable[str]]
+) -> SymptomVocabulary:
+    """Checkbox symptoms first (in display order), then disease-only symptoms sorted by name."""
+    listed = [sym for syms in categories.values() for sym in syms]
+    seen = set(listed)
+    extra = sorted({sym for sset in symptom_sets for sym in sset} - seen)
+    return SymptomVocabulary(listed + extra)
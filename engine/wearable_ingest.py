@@ -0,0 +1,303 @@
+"""
+Streaming import of phone and wearable exports into the vitals store.
+
+Apple Health exports (export.xml, gzipped, or the export.zip the phone
+produces) are read with incremental XML parsing: each <Record> is mapped as
+soon as its end tag is seen and then dropped, so no DOM is built. Google Fit
+and Fitbit CSV exports are read in chunks. Record types and columns are mapped
+onto the vitals metrics with engine/data/wearable_fields.json.
+
+Readings ("sample" metrics) are appended to the store in batches; repeats of
+a reading for the same metric and second are kept once. Daily totals (steps,
+sleep, water, exercise) are summed per day and source, and each day keeps its
+largest source total, so a phone and a watch counting the same steps are not
+added together. Files given in one run are deduplicated against each other.
+
+Usage:
+    python -m engine.wearable_ingest export.zip fitbit_activities.csv --db vitals.sqlite --subject me
+"""
+
+import argparse
+import contextlib
+import gzip
+import json
+import math
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+from collections import defaultdict
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .timeseries import TimeSeriesStore
+
+DEFAULT_FIELDS_PATH = os.path.join(os.path.dirname(__file__), "data", "wearable_fields.json")
+DEFAULT_BATCH_ROWS = 100_000
+DEFAULT_CHUNK_ROWS = 200_000
+METRIC_KINDS = ("sample", "daily_total")
+STAT_KEYS = ("records", "samples", "duplicates", "days", "overlapping_days", "unmapped", "skipped")
+
+
+def load_wearable_fields(path: str = DEFAULT_FIELDS_PATH) -> Dict:
+    """Read a wearable field map, checking that every mapping names a known metric."""
+    with open(path, encoding="utf-8") as fh:
+        fields = json.load(fh)
+    metrics = fields["metrics"]
+    for metric, kind in metrics.items():
+        if kind not in METRIC_KINDS:
+            raise ValueError(f"wearable field map: {metric!r} has unknown kind {kind!r}")
+    for section in ("apple_health", "csv_columns"):
+        for name, spec in fields[section].items():
+            if spec["metric"] not in metrics:
+                raise ValueError(f"wearable field map: {name!r} maps to unknown metric {spec['metric']!r}")
+    fields["csv_columns"] = {normalize_column(name): spec for name, spec in fields["csv_columns"].items()}
+    fields["csv_time_columns"] = [normalize_column(name) for name in fields["csv_time_columns"]]
+    return fields
+
+
+def normalize_column(name: str) -> str:
+    return str(name).strip().lower()
+
+
+class _Writer:
+    """Appends readings to the store in batches and keeps daily totals per source until finish()."""
+
+    def __init__(self, store: TimeSeriesStore, subject: str, batch_rows: int, stats: Dict[str, int]):
+        self.store = store
+        self.subject = subject
+        self.batch_rows = batch_rows
+        self.stats = stats
+        self._times = defaultdict(list)
+        self._values = defaultdict(list)
+        self._pending = 0
+        self._totals = defaultdict(float)  # (metric, day, source) -> total
+
+    def sample(self, metric: str, moment: str, value: float) -> None:
+        """Queue one reading; `moment` is 'YYYY-MM-DD HH:MM:SS' local time."""
+        self._times[metric].append(moment)
+        self._values[metric].append(value)
+        self._pending += 1
+        if self._pending >= self.batch_rows:
+            self.flush()
+
+    def samples(self, metric: str, times: np.ndarray, values: np.ndarray) -> None:
+        """Append a chunk of readings (datetime64 times) right away."""
+        keep = ~np.isnan(values)
+        self.stats["skipped"] += int((~keep).sum())
+        if keep.any():
+            self._add(metric, times[keep], values[keep])
+
+    def total(self, metric: str, day: str, source: str, value: float) -> None:
+        self._totals[(metric, day, source)] += value
+
+    def totals(self, metric: str, days: np.ndarray, source: str, values: np.ndarray) -> None:
+        """Add a chunk of values (datetime64[D] days) to the day totals of `source`."""
+        keep = ~np.isnan(values)
+        self.stats["skipped"] += int((~keep).sum())
+        sums = pd.Series(values[keep]).groupby(days[keep]).sum()
+        for day, value in zip(np.datetime_as_string(sums.index.to_numpy().astype("datetime64[D]")), sums.to_numpy()):
+            self._totals[(metric, day, source)] += value
+
+    def _add(self, metric: str, times: np.ndarray, values: np.ndarray) -> None:
+        # Keep the last reading of each second
+        order = np.argsort(times, kind="stable")
+        times, values = times[order], values[order]
+        last = np.append(times[1:] != times[:-1], True)
+        self.stats["duplicates"] += int((~last).sum())
+        self.stats["samples"] += self.store.add(self.subject, metric, times[last], values[last])
+
+    def flush(self) -> None:
+        for metric, times in self._times.items():
+            self._add(metric, np.array(times, dtype="datetime64[s]"), np.array(self._values[metric], dtype=float))
+        self._times.clear()
+        self._values.clear()
+        self._pending = 0
+
+    def finish(self) -> None:
+        """Flush the readings and store each day's largest source total."""
+        self.flush()
+        best: Dict[tuple, float] = {}
+        sources: Dict[tuple, int] = defaultdict(int)
+        for (metric, day, _), value in self._totals.items():
+            key = (metric, day)
+            sources[key] += 1
+            best[key] = max(best.get(key, -math.inf), value)
+        self.stats["overlapping_days"] += sum(count > 1 for count in sources.values())
+        by_metric = defaultdict(lambda: ([], []))
+        for (metric, day), value in best.items():
+            by_metric[metric][0].append(day)
+            by_metric[metric][1].append(value)
+        for metric, (days, values) in by_metric.items():
+            self.stats["days"] += self.store.add(self.subject, metric, np.array(days, dtype="datetime64[D]"), values)
+        self._totals.clear()
+
+
+@contextlib.contextmanager
+def _open_export(path: str):
+    """Binary stream of an Apple Health export.xml, plain, gzipped or inside the export zip."""
+    lower = path.lower()
+    if lower.endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            names = [name for name in archive.namelist() if name.rsplit("/", 1)[-1] == "export.xml"]
+            if not names:
+                raise ValueError(f"{path}: no export.xml in the archive")
+            with archive.open(names[0]) as fh:
+                yield fh
+    else:
+        with (gzip.open(path, "rb") if lower.endswith(".gz") else open(path, "rb")) as fh:
+            yield fh
+
+
+def _apple_health(path: str, writer: _Writer, fields: Dict, stats: Dict[str, int]) -> None:
+    types = fields["apple_health"]
+    kinds = fields["metrics"]
+    with _open_export(path) as fh:
+        events = ET.iterparse(fh, events=("start", "end"))
+        _, root = next(events)
+        for event, elem in events:
+            if event != "end" or elem.tag != "Record":
+                continue
+            stats["records"] += 1
+            spec = types.get(elem.get("type"))
+            if spec is None:
+                stats["unmapped"] += 1
+            else:
+                _apple_record(elem, spec, kinds[spec["metric"]], writer, stats)
+            # Drop everything parsed so far; an open parent (e.g. a Correlation) still gets its children
+            root.clear()
+
+
+def _apple_record(elem, spec: Dict, kind: str, writer: _Writer, stats: Dict[str, int]) -> None:
+    metric = spec["metric"]
+    start = elem.get("startDate") or ""
+    source = elem.get("sourceName", "")
+    if "duration" in spec:
+        end = elem.get("endDate") or ""
+        if elem.get("value") not in spec["values"] or len(start) < 19 or len(end) < 19:
+            stats["skipped"] += 1
+            return
+        hours = (np.datetime64(end[:19]) - np.datetime64(start[:19])) / np.timedelta64(1, "h")
+        # A night counts towards the day it ends on
+        writer.total(metric, end[:10], source, hours)
+        return
+    units = spec.get("units")
+    scale = units.get(elem.get("unit")) if units else 1
+    try:
+        value = float(elem.get("value")) * scale
+    except (TypeError, ValueError):
+        stats["skipped"] += 1
+        return
+    if len(start) < 19:
+        stats["skipped"] += 1
+    elif kind == "sample":
+        writer.sample(metric, start[:19], value)
+    else:
+        writer.total(metric, start[:10], source, value)
+
+
+def _csv_times(column: pd.Series) -> pd.Series:
+    """Parse a date or time column to naive local wall-clock times (NaT when unreadable)."""
+    times = pd.to_datetime(column, errors="coerce", format="mixed")
+    if getattr(times.dt, "tz", None) is not None:
+        times = times.dt.tz_localize(None)
+    return times
+
+
+def _wearable_csv(path: str, writer: _Writer, fields: Dict, chunk_rows: int, stats: Dict[str, int]) -> None:
+    header = pd.read_csv(path, nrows=0).columns
+    names = {column: normalize_column(column) for column in header}
+    time_column = next((column for name in fields["csv_time_columns"] for column in header
+                        if names[column] == name), None)
+    if time_column is None:
+        raise ValueError(f"{path}: no date or time column in the header")
+    columns = {column: fields["csv_columns"][names[column]] for column in header
+               if names[column] in fields["csv_columns"]}
+    if not columns:
+        raise ValueError(f"{path}: no vitals columns in the header")
+    kinds = fields["metrics"]
+    source = os.path.basename(path)
+    reader = pd.read_csv(path, chunksize=chunk_rows, usecols=[time_column, *columns], thousands=",")
+    with reader:
+        for chunk in reader:
+            stats["records"] += len(chunk)
+            times = _csv_times(chunk[time_column])
+            valid = times.notna().to_numpy()
+            stats["skipped"] += int((~valid).sum()) * len(columns)
+            stamps = times.to_numpy()[valid].astype("datetime64[s]")
+            for column, spec in columns.items():
+                metric = spec["metric"]
+                values = pd.to_numeric(chunk[column], errors="coerce").to_numpy(dtype=float)[valid] * spec.get("scale", 1)
+                if kinds[metric] == "sample":
+                    writer.samples(metric, stamps, values)
+                else:
+                    writer.totals(metric, stamps.astype("datetime64[D]"), source, values)
+
+
+def import_wearable(
+    paths: Union[str, Sequence[str]],
+    store: TimeSeriesStore,
+    subject: str,
+    fields: Optional[Dict] = None,
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    stats: Optional[Dict[str, int]] = None
+) -> Dict[str, int]:
+    """
+    Import Apple Health exports (.xml, .xml.gz, .zip) and Google Fit / Fitbit
+    CSV exports into `store` under `subject`. Returns the counts of records
+    read, readings stored, repeated readings dropped, day totals stored, days
+    reported by more than one source, unmapped records and skipped values.
+    """
+    fields = fields or load_wearable_fields()
+    stats = stats if stats is not None else {}
+    for key in STAT_KEYS:
+        stats.setdefault(key, 0)
+    writer = _Writer(store, subject, batch_rows, stats)
+    for path in [paths] if isinstance(paths, str) else paths:
+        if path.lower().endswith((".xml", ".xml.gz", ".zip")):
+            _apple_health(path, writer, fields, stats)
+        else:
+            _wearable_csv(path, writer, fields, chunk_rows, stats)
+        writer.flush()
+    writer.finish()
+    return stats
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m engine.wearable_ingest",
+        description="Import Apple Health, Google Fit and Fitbit exports into the vitals store.")
+    parser.add_argument("inputs", nargs="+", help="export.zip / export.xml(.gz) or CSV exports")
+    parser.add_argument("--db", default=os.environ.get("MEDICARE_VITALS_DB"),
+                        help="vitals SQLite file (default: $MEDICARE_VITALS_DB)")
+    parser.add_argument("--subject", default=os.environ.get("MEDICARE_VITALS_SUBJECT", "me"),
+                        help="subject the vitals belong to (default: $MEDICARE_VITALS_SUBJECT or 'me')")
+    parser.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS,
+                        help=f"readings written per batch (default: {DEFAULT_BATCH_ROWS})")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f"CSV rows read per chunk (default: {DEFAULT_CHUNK_ROWS})")
+    parser.add_argument("--fields", default=DEFAULT_FIELDS_PATH, help="wearable field map JSON")
+    args = parser.parse_args(argv)
+    if not args.db:
+        parser.error("--db is required when MEDICARE_VITALS_DB is not set")
+
+    store = TimeSeriesStore(args.db)
+    started = time.perf_counter()
+    try:
+        stats = import_wearable(args.inputs, store, args.subject, load_wearable_fields(args.fields),
+                                batch_rows=args.batch_rows, chunk_rows=args.chunk_rows)
+    finally:
+        store.close()
+    print(f"{stats['records']} records: {stats['samples']} readings ({stats['duplicates']} repeats dropped), "
+          f"{stats['days']} day totals ({stats['overlapping_days']} from several sources), "
+          f"{stats['unmapped']} unmapped, {stats['skipped']} skipped in {time.perf_counter() - started:.1f} s",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
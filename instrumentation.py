@@ -0,0 +1,267 @@
+"""
+Per-rerun timing for the Streamlit app.
+
+Page sections and helpers are timed with time.perf_counter into the rerun
+being executed on the current script thread. Each finished rerun adds its
+latency and payload size (bytes of the messages sent to the browser) to the
+session's history and to process-wide totals. The totals can be exposed
+as a Prometheus text-format file, and the history is shown in an optional
+sidebar panel.
+
+Payload sizes are read by wrapping Streamlit's private per-run message
+queue (ScriptRunContext._enqueue). When a Streamlit version no longer has
+it, payload counting is switched off with a warning and everything else
+keeps working.
+
+Configuration (environment):
+    MEDICARE_METRICS_FILE   write Prometheus metrics to this path
+    MEDICARE_PERF_PANEL=1   always show the sidebar panel (otherwise ?perf=1)
+"""
+
+import os
+import threading
+import time
+import warnings
+from collections import deque
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+METRICS_FILE = os.environ.get("MEDICARE_METRICS_FILE")
+PANEL_ALWAYS_ON = os.environ.get("MEDICARE_PERF_PANEL") == "1"
+METRICS_WRITE_INTERVAL = 1.0  # seconds between metrics-file rewrites
+HISTORY_LENGTH = 200          # reruns kept per session
+RERUN_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_local = threading.local()
+# Cleared when ScriptRunContext has no _enqueue to wrap
+_payload_counted = True
+
+
+class _Rerun:
+    """Timings collected during one script run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sections: Dict[str, List[float]] = {}  # name -> [seconds, calls]
+        self.open: List["_Section"] = []            # started and not yet stopped, innermost last
+        self.payload_bytes = 0
+
+    def add(self, name: str, seconds: float) -> None:
+        entry = self.sections.get(name)
+        if entry is None:
+            self.sections[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+
+class _Section:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def start(self) -> "_Section":
+        self.started = time.perf_counter()
+        rerun = getattr(_local, "rerun", None)
+        if rerun is not None:
+            rerun.open.append(self)
+        return self
+
+    def stop(self) -> None:
+        rerun = getattr(_local, "rerun", None)
+        if rerun is not None and self in rerun.open:
+            rerun.open.remove(self)
+            rerun.add(self.name, time.perf_counter() - self.started)
+
+    def __enter__(self) -> "_Section":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def section(name: str) -> _Section:
+    """
+    Time a block as `name` in the current rerun: `with section("sidebar"):`,
+    or `timer = section("page").start()` ... `timer.stop()` around code that
+    should not be re-indented. Nested sections are timed inclusively; any
+    still running when the rerun finishes (e.g. the page called st.rerun())
+    are stopped by finish_rerun().
+    """
+    return _Section(name)
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Decorator: time every call of a helper as one section (named after the function by default)."""
+    def decorate(func: Callable) -> Callable:
+        label = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                rerun = getattr(_local, "rerun", None)
+                if rerun is not None:
+                    rerun.add(label, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+def _count_payload(ctx) -> None:
+    """Wrap the session's message queue once so every rerun can sum the bytes it sends."""
+    global _payload_counted
+    if ctx is None or not _payload_counted or getattr(ctx, "_medicare_payload_hook", False):
+        return
+    enqueue = getattr(ctx, "_enqueue", None)
+    if not callable(enqueue):
+        _payload_counted = False
+        warnings.warn("this Streamlit version has no ScriptRunContext._enqueue; "
+                      "rerun payload sizes will not be recorded", RuntimeWarning, stacklevel=2)
+        return
+
+    def counting_enqueue(msg):
+        rerun = getattr(_local, "rerun", None)
+        if rerun is not None:
+            rerun.payload_bytes += msg.ByteSize()
+        enqueue(msg)
+
+    ctx._enqueue = counting_enqueue
+    ctx._medicare_payload_hook = True
+
+
+def begin_rerun() -> None:
+    """Start recording this script run; call once, right after st.set_page_config."""
+    _local.rerun = _Rerun()
+    _count_payload(get_script_run_ctx())
+
+
+class _Registry:
+    """Process-wide totals across all sessions, rendered as Prometheus text."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reruns: Dict[str, List] = {}    # page -> [count, seconds, payload bytes, bucket counts]
+        self.sections: Dict[str, List[float]] = {}  # name -> [seconds, calls]
+        self.last_write = 0.0
+
+    def record(self, page: str, seconds: float, payload_bytes: int, sections: Dict[str, List[float]]) -> None:
+        with self.lock:
+            entry = self.reruns.setdefault(page, [0, 0.0, 0, [0] * len(RERUN_BUCKETS)])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] += payload_bytes
+            for i, bound in enumerate(RERUN_BUCKETS):
+                if seconds <= bound:
+                    entry[3][i] += 1
+            for name, (spent, calls) in sections.items():
+                total = self.sections.setdefault(name, [0.0, 0])
+                total[0] += spent
+                total[1] += calls
+
+    def prometheus(self) -> str:
+        lines = [
+            "# HELP medicare_rerun_seconds Streamlit script rerun wall time.",
+            "# TYPE medicare_rerun_seconds histogram",
+        ]
+        with self.lock:
+            reruns = {page: (count, seconds, payload, list(buckets))
+                      for page, (count, seconds, payload, buckets) in self.reruns.items()}
+            sections = {name: tuple(total) for name, total in self.sections.items()}
+        for page, (count, seconds, _, buckets) in sorted(reruns.items()):
+            label = _label(page)
+            for bound, hits in zip(RERUN_BUCKETS, buckets):
+                lines.append(f'medicare_rerun_seconds_bucket{{page="{label}",le="{bound}"}} {hits}')
+            lines.append(f'medicare_rerun_seconds_bucket{{page="{label}",le="+Inf"}} {count}')
+            lines.append(f'medicare_rerun_seconds_sum{{page="{label}"}} {seconds:.6f}')
+            lines.append(f'medicare_rerun_seconds_count{{page="{label}"}} {count}')
+        if _payload_counted:
+            lines += ["# HELP medicare_rerun_payload_bytes Bytes sent to the browser per rerun.",
+                      "# TYPE medicare_rerun_payload_bytes summary"]
+            for page, (count, _, payload, _) in sorted(reruns.items()):
+                label = _label(page)
+                lines.append(f'medicare_rerun_payload_bytes_sum{{page="{label}"}} {payload}')
+                lines.append(f'medicare_rerun_payload_bytes_count{{page="{label}"}} {count}')
+        lines += ["# HELP medicare_section_seconds Time spent in an instrumented section or helper (inclusive).",
+                  "# TYPE medicare_section_seconds summary"]
+        for name, (spent, calls) in sorted(sections.items()):
+            label = _label(name)
+            lines.append(f'medicare_section_seconds_sum{{section="{label}"}} {spent:.6f}')
+            lines.append(f'medicare_section_seconds_count{{section="{label}"}} {calls}')
+        return "\n".join(lines) + "\n"
+
+    def maybe_write(self, path: str) -> None:
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last_write < METRICS_WRITE_INTERVAL:
+                return
+            self.last_write = now
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            fh.write(self.prometheus())
+        os.replace(tmp_path, path)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = _Registry()
+
+
+def finish_rerun(page: str) -> Optional[Dict]:
+    """
+    Close the current rerun: stop any sections still running, add it to the
+    session history and the process totals, refresh the metrics file, and
+    return the rerun summary. Call it from a `finally:` so reruns a page cuts
+    short are recorded too.
+    """
+    rerun = getattr(_local, "rerun", None)
+    if rerun is None:
+        return None
+    for timer in reversed(rerun.open[:]):
+        timer.stop()
+    _local.rerun = None
+    seconds = time.perf_counter() - rerun.started
+    summary = {"time": time.strftime("%H:%M:%S"), "page": page, "rerun_ms": seconds * 1000,
+               "payload_kb": rerun.payload_bytes / 1024 if _payload_counted else None,
+               "sections": {name: (spent * 1000, calls) for name, (spent, calls) in rerun.sections.items()}}
+    history = st.session_state.setdefault("perf_history", deque(maxlen=HISTORY_LENGTH))
+    history.append(summary)
+    REGISTRY.record(page, seconds, rerun.payload_bytes, rerun.sections)
+    if METRICS_FILE:
+        REGISTRY.maybe_write(METRICS_FILE)
+    return summary
+
+
+def panel_enabled() -> bool:
+    return PANEL_ALWAYS_ON or st.query_params.get("perf") == "1"
+
+
+def render_panel(summary: Optional[Dict]) -> None:
+    """Sidebar debug panel: last rerun breakdown and this session's rerun history."""
+    if summary is None:
+        return
+    history = list(st.session_state.get("perf_history", []))
+    with st.sidebar.expander("⏱️ Performance", expanded=True):
+        m1, m2 = st.columns(2)
+        m1.metric("Rerun", f"{summary['rerun_ms']:.0f} ms")
+        payload_kb = summary["payload_kb"]
+        m2.metric("Payload", "n/a" if payload_kb is None else f"{payload_kb:.0f} KB")
+        sections = pd.DataFrame(
+            [(name, ms, calls) for name, (ms, calls) in summary["sections"].items()],
+            columns=["section", "ms", "calls"]).sort_values("ms", ascending=False)
+        st.dataframe(sections, hide_index=True, use_container_width=True,
+                     column_config={"ms": st.column_config.NumberColumn(format="%.2f")})
+        if len(history) > 1:
+            trend = pd.DataFrame(history)[["rerun_ms", "payload_kb"]]
+            st.caption(f"Last {len(history)} reruns this session")
+            st.line_chart(trend["rerun_ms"], height=120)
+            if payload_kb is not None:
+                st.line_chart(trend["payload_kb"], height=120)
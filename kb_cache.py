@@ -0,0 +1,51 @@
+"""
+Knowledge base, diagnosis result cache, lab history and patient store shared
+by every Streamlit session in the process.
+
+The catalog is built once with st.cache_resource and keyed by the knowledge-base
+fingerprint, so editing or rebuilding the files under engine/data/knowledge_base,
+or the modifier and drug class tables, swaps in a fresh catalog on the next
+rerun without restarting the server.
+"""
+
+import os
+
+import streamlit as st
+
+from engine import Catalog, DiagnosisCache, LabHistory, PatientStore, kb_fingerprint, load_catalog
+
+# Optional SQLite file that keeps diagnosis results across restarts
+DIAGNOSIS_CACHE_PATH = os.environ.get("MEDICARE_DX_CACHE")
+DIAGNOSIS_CACHE_SIZE = int(os.environ.get("MEDICARE_DX_CACHE_SIZE", "4096"))
+# SQLite file holding every lab result entered on the Lab Results page
+LAB_HISTORY_PATH = os.environ.get("MEDICARE_LAB_HISTORY", "lab_history.sqlite")
+# SQLite file (WAL mode) holding consultations, medications, appointments and goals
+PATIENT_DB_PATH = os.environ.get("MEDICARE_PATIENT_DB", "patient_data.sqlite")
+
+
+@st.cache_resource(max_entries=1, show_spinner="Loading knowledge base...")
+def _load_catalog(fingerprint) -> Catalog:
+    return load_catalog().warm_up()
+
+
+def shared_catalog() -> Catalog:
+    """The process-wide catalog for the current knowledge-base files (read-only)."""
+    return _load_catalog(kb_fingerprint())
+
+
+@st.cache_resource
+def diagnosis_cache() -> DiagnosisCache:
+    """Process-wide result cache. Keys carry the symptom-matrix signature, so a reloaded catalog never gets stale hits."""
+    return DiagnosisCache(DIAGNOSIS_CACHE_SIZE, DIAGNOSIS_CACHE_PATH)
+
+
+@st.cache_resource
+def lab_history() -> LabHistory:
+    """Process-wide lab result store used for trends and changes since the last panel."""
+    return LabHistory(LAB_HISTORY_PATH)
+
+
+@st.cache_resource
+def patient_store() -> PatientStore:
+    """Process-wide store of every patient's records, read by the pages on each rerun."""
+    return PatientStore(PATIENT_DB_PATH)
@@ -0,0 +1,20 @@
+"""
+Start the app with the shared knowledge base already loaded, so the first
+session does not pay for it.
+
+Usage:
+    python serve.py [streamlit run options]
+"""
+
+import os
+import sys
+
+from streamlit.web import cli
+
+import kb_cache
+
+if __name__ == "__main__":
+    kb_cache.shared_catalog()
+    app = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+    sys.argv = ["streamlit", "run", app, *sys.argv[1:]]
+    sys.exit(cli.main())
@@ -0,0 +1,9 @@
+import pytest
+
+from engine import load_catalog
+
+
+@pytest.fixture(scope="session")
+def catalog():
+    """The bundled knowledge base, compiled once for the whole run."""
+    return load_catalog()
@@ -0,0 +1,62 @@
+"""InteractionIndex.check against the bundled formulary and a small synthetic one."""
+
+from engine import InteractionIndex, MedicationIndex
+
+CLASSES = {
+    "NSAIDs": {"aliases": ["NSAID"], "categories": ["NSAID"]},
+    "Statins": {"aliases": ["Statin"], "categories": ["Statin"]},
+}
+FORMULARY = {
+    "Warfarin": {"generic": "warfarin", "brand_names": ["Coumadin"], "category": "Anticoagulant",
+                 "interactions": ["NSAIDs — increase bleeding risk"], "contraindications": ["Active bleeding"]},
+    "Ibuprofen": {"generic": "ibuprofen", "brand_names": ["Advil"], "category": "NSAID",
+                  "interactions": [], "contraindications": ["Hypersensitivity to NSAIDs"]},
+    "Naproxen": {"generic": "naproxen", "brand_names": ["Aleve"], "category": "NSAID",
+                 "interactions": [], "contraindications": []},
+    "Simvastatin": {"generic": "simvastatin", "brand_names": ["Zocor"], "category": "Statin",
+                    "interactions": [], "contraindications": ["Concurrent Coumadin use"]},
+}
+
+
+def index():
+    return InteractionIndex(FORMULARY, MedicationIndex(FORMULARY), CLASSES)
+
+
+def test_class_membership():
+    interactions = index()
+    assert interactions.classes_of["Ibuprofen"] == {"NSAIDs"}
+    assert interactions.members["NSAIDs"] == ("Ibuprofen", "Naproxen")
+    assert interactions.classes_of["Warfarin"] == frozenset()
+
+
+def test_class_interaction_works_both_ways():
+    interactions = index()
+    note = {"kind": "interaction", "source": "Warfarin", "note": "NSAIDs — increase bleeding risk"}
+    assert interactions.check("Naproxen", ["Warfarin"]) == [{"drug": "Warfarin", **note}]
+    assert interactions.check("Warfarin", ["Ibuprofen", "Naproxen"]) == [
+        {"drug": "Ibuprofen", **note}, {"drug": "Naproxen", **note}]
+
+
+def test_contraindication_by_brand_comes_first():
+    conflicts = index().check("Warfarin", ["Simvastatin", "Ibuprofen"])
+    assert [(c["drug"], c["kind"]) for c in conflicts] == [("Simvastatin", "contraindication"),
+                                                           ("Ibuprofen", "interaction")]
+
+
+def test_own_class_allergy_note_is_not_an_interaction():
+    assert index().check("Ibuprofen", ["Naproxen"]) == []
+
+
+def test_no_conflicts_with_itself_or_unrelated_drugs():
+    interactions = index()
+    assert interactions.check("Warfarin", ["Warfarin"]) == []
+    assert interactions.check("Simvastatin", ["Naproxen"]) == []
+    assert interactions.check("Warfarin", []) == []
+
+
+def test_bundled_formulary(catalog):
+    check = catalog.interactions.check
+    assert {(c["source"], c["note"]) for c in check("Amoxicillin", ["Warfarin"])} == {
+        ("Warfarin", "Antibiotics — increase INR"), ("Amoxicillin", "Warfarin — may increase INR")}
+    assert [c["note"] for c in check("Sertraline", ["Warfarin"])] == ["Warfarin/NSAIDs — bleeding risk"]
+    assert check("Metformin", ["Atorvastatin", "Albuterol"]) == []
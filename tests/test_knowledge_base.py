@@ -0,0 +1,104 @@
+"""JSON Lines knowledge base: index round trip, lazy records and change detection."""
+
+import json
+import os
+import shutil
+
+import pytest
+
+from engine import KnowledgeBase, kb_fingerprint, load_catalog
+from engine.kb_build import build_index
+from engine.knowledge_base import DEFAULT_KB_DIR, INDEX_FILE, TABLES
+
+
+@pytest.fixture
+def kb_dir(tmp_path):
+    directory = tmp_path / "knowledge_base"
+    shutil.copytree(DEFAULT_KB_DIR, directory)
+    return str(directory)
+
+
+def read_records(directory, table):
+    with open(os.path.join(directory, TABLES[table][0]), encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def edit_in_place(directory, filename, old, new):
+    """Replace `old` with the same-length `new` and push the mtime forward."""
+    assert len(old) == len(new)
+    path = os.path.join(directory, filename)
+    with open(path, encoding="utf-8") as fh:
+        text = fh.read()
+    assert old in text
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        fh.write(text.replace(old, new, 1))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+@pytest.mark.parametrize("table", list(TABLES))
+def test_index_round_trip(kb_dir, table):
+    build_index(kb_dir)
+    kb = KnowledgeBase(kb_dir)
+    assert not kb.stale_index
+    records = kb.tables[table]
+    expected = read_records(kb_dir, table)
+    assert list(records) == [record["name"] for record in expected]
+    for source in expected:
+        record = records[source.pop("name")]
+        for field in TABLES[table][1]:
+            assert record[field] == (frozenset(source[field]) if field == "symptom_set" else source[field])
+        assert not record.loaded
+        assert dict(record) == {**source, **({"symptom_set": frozenset(source["symptom_set"])}
+                                             if "symptom_set" in source else {})}
+        assert record.loaded
+
+
+@pytest.mark.parametrize("table", list(TABLES))
+def test_scan_matches_lazy_records(kb_dir, table):
+    kb = KnowledgeBase(kb_dir)
+    scanned = kb.scan(table)
+    assert not any(record.loaded for record in kb.tables[table].values())
+    assert scanned == {name: dict(record) for name, record in kb.tables[table].items()}
+
+
+def test_version_bumps_only_when_records_change(kb_dir):
+    first = build_index(kb_dir)["version"]
+    assert build_index(kb_dir)["version"] == first
+    edit_in_place(kb_dir, "diseases.jsonl", '"icd_10": "J11.1"', '"icd_10": "J11.8"')
+    assert build_index(kb_dir)["version"] == first + 1
+
+
+def test_same_size_edit_is_reindexed_in_memory(kb_dir):
+    edit_in_place(kb_dir, "diseases.jsonl", '"severity": "Moderate"', '"severity": "Moderat3"')
+    kb = KnowledgeBase(kb_dir)
+    assert kb.stale_index
+    assert kb.diseases["Influenza"]["severity"] == "Moderat3"
+    assert kb.diseases["Influenza"]["prevalence"] == "Common (seasonal)"
+    with open(os.path.join(kb_dir, INDEX_FILE), encoding="utf-8") as fh:
+        assert json.load(fh)["checksum"] != kb.checksum
+
+
+def test_fingerprint_changes_on_edit(kb_dir):
+    before = kb_fingerprint(kb_dir)
+    assert kb_fingerprint(kb_dir) == before
+    edit_in_place(kb_dir, "medications.jsonl", '"Glucophage"', '"Glucophaga"')
+    assert kb_fingerprint(kb_dir) != before
+
+
+def test_reloaded_catalog_sees_the_edit(kb_dir):
+    assert load_catalog(kb_dir).medication_index.resolve("Glucophage") == "Metformin"
+    edit_in_place(kb_dir, "medications.jsonl", '"Glucophage"', '"Glucophaga"')
+    catalog = load_catalog(kb_dir)
+    assert catalog.medication_index.resolve("Glucophage") is None
+    assert catalog.medication_index.resolve("Glucophaga") == "Metformin"
+
+
+def test_duplicate_names_are_rejected(kb_dir):
+    path = os.path.join(kb_dir, "medications.jsonl")
+    with open(path, encoding="utf-8") as fh:
+        first = fh.readline()
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write(first)
+    with pytest.raises(ValueError, match="duplicate"):
+        build_index(kb_dir)
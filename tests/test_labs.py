@@ -0,0 +1,65 @@
+"""Lab rule table: frame interpretation against single panels, and chunk-size independent ingest."""
+
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import interpret_lab_frame, interpret_labs, lab_rules
+from engine.lab_ingest import iter_lab_findings
+
+NORMAL = {"wbc": 7.0, "hemoglobin": 14.0, "platelets": 250, "mcv": 90, "glucose": 90, "creatinine": 0.9,
+          "potassium": 4.2, "sodium": 140, "calcium": 9.5, "ldl": 90, "triglycerides": 120, "hdl": 55,
+          "tsh": 2.0, "t4_free": 1.2}
+
+
+def random_panels(count, seed=5):
+    """Panels with values spread from half to twice normal, some of them missing."""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        rows.append({field: (np.nan if rng.random() < 0.1 else round(value * rng.uniform(0.5, 2.0), 2))
+                     for field, value in NORMAL.items()})
+    return pd.DataFrame(rows, index=[f"A{i:04d}" for i in range(count)])
+
+
+def test_normal_panel_has_no_findings():
+    assert interpret_labs(**NORMAL) == ([], [])
+
+
+def test_frame_matches_single_panels():
+    panels = random_panels(300)
+    frame = interpret_lab_frame(panels)
+    table = lab_rules()
+    expected = []
+    for panel, row in panels.iterrows():
+        findings, _ = table.interpret(row.to_dict())
+        expected.extend((panel, *finding) for finding in findings)
+    got = list(zip(frame["panel"], frame["analyte"], frame["value"], frame["status"], frame["reference"],
+                   frame["interpretation"]))
+    assert got == expected
+
+
+def long_file(panels, path):
+    rows = [(panel, field.upper(), value) for panel, row in panels.iterrows()
+            for field, value in row.items() if not pd.isna(value)]
+    pd.DataFrame(rows, columns=["accession", "code", "value"]).to_csv(path, sep="|", index=False)
+
+
+def wide_file(panels, path):
+    panels.rename_axis("accession").reset_index().to_csv(path, index=False)
+
+
+@pytest.mark.parametrize("write", [long_file, wide_file])
+def test_ingest_is_independent_of_chunk_size(tmp_path, write):
+    panels = random_panels(40, seed=8)
+    path = tmp_path / "results.csv"
+    write(panels, path)
+    expected = interpret_lab_frame(panels).reset_index(drop=True)
+    for chunk_rows in (1, 7, 64, 100_000):
+        stats = {}
+        got = pd.concat(list(iter_lab_findings(str(path), chunk_rows=chunk_rows, stats=stats)), ignore_index=True)
+        assert stats["panels"] == len(panels)
+        assert stats["findings"] == len(expected)
+        pd.testing.assert_frame_equal(got.astype(str), expected.astype(str), check_dtype=False)
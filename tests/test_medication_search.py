@@ -0,0 +1,85 @@
+"""MedicationIndex: prefix, fuzzy and alias lookup, category filter and limits."""
+
+import pytest
+
+from engine import MedicationIndex
+
+FORMULARY = {
+    "Metoprolol": {"generic": "metoprolol tartrate", "brand_names": ["Lopressor", "Toprol XL"],
+                   "category": "Beta Blocker", "indications": ["Hypertension", "Angina"]},
+    "Atenolol": {"generic": "atenolol", "brand_names": ["Tenormin"], "category": "Beta Blocker",
+                 "indications": ["Hypertension"]},
+    "Lisinopril": {"generic": "lisinopril", "brand_names": ["Zestril", "Prinivil"], "category": "ACE Inhibitor",
+                   "indications": ["Hypertension", "Heart failure"]},
+    "Metformin": {"generic": "metformin hydrochloride", "brand_names": ["Glucophage"], "category": "Biguanide",
+                  "indications": ["Type 2 diabetes"], "mechanism": "Reduces hepatic glucose output"},
+}
+
+
+@pytest.fixture(scope="module")
+def index():
+    return MedicationIndex(FORMULARY)
+
+
+def test_empty_query_lists_by_name(index):
+    assert index.search("") == (["Atenolol", "Lisinopril", "Metformin", "Metoprolol"], 4)
+    assert index.search("  ", "Beta Blocker") == (["Atenolol", "Metoprolol"], 2)
+    assert index.search("", limit=1) == (["Atenolol"], 4)
+
+
+def test_prefixes_of_every_field(index):
+    assert index.search("meto")[0] == ["Metoprolol"]
+    assert index.search("topr")[0] == ["Metoprolol"]
+    assert index.search("hepatic")[0] == ["Metformin"]
+    assert set(index.search("hypert")[0]) == {"Atenolol", "Lisinopril", "Metoprolol"}
+
+
+def test_every_term_must_match(index):
+    assert index.search("hypertension heart")[0] == ["Lisinopril"]
+
+
+def test_name_outranks_indication(index):
+    names, count = index.search("met")
+    assert count == 2
+    assert set(names) == {"Metformin", "Metoprolol"}
+
+
+def test_misspelling_falls_back_to_similar_terms(index):
+    assert index.search("metformni")[0] == ["Metformin"]
+    assert index.search("lisinoprl")[0] == ["Lisinopril"]
+
+
+def test_exact_brand_ranks_first(index):
+    assert index.search("glucophage")[0][0] == "Metformin"
+    assert index.resolve("TOPROL-XL") == "Metoprolol"
+    assert index.resolve("unknown") is None
+
+
+def test_category_and_limit(index):
+    assert index.search("hypertension", "ACE Inhibitor") == (["Lisinopril"], 1)
+    assert index.search("hypertension", "No Such Category") == ([], 0)
+    names, count = index.search("hypertension", limit=2)
+    assert count == 3 and len(names) == 2
+
+
+def test_categories(index):
+    assert index.categories == ["ACE Inhibitor", "Beta Blocker", "Biguanide"]
+
+
+def test_substring_matches_rank_above_term_matches(index):
+    # Neither query starts a term: only the substring match finds these
+    assert index.search("olol") == (["Atenolol", "Metoprolol"], 2)
+    assert index.search("pril")[0] == ["Lisinopril"]
+    names, count = index.search("met")
+    assert names[:2] == ["Metformin", "Metoprolol"] and count == 2
+
+
+@pytest.mark.parametrize("query", ["pril", "form", "astat", "cophag", "olol", "lin", "pro", "zole"])
+def test_finds_every_substring_match_of_the_old_filter(catalog, query):
+    # The Medications page used to filter by substring of the name, generic name or a brand name
+    expected = {name for name, record in catalog.medications.items()
+                if query in name.lower() or query in record["generic"].lower()
+                or any(query in brand.lower() for brand in record.get("brand_names", ()))}
+    names, count = catalog.medication_index.search(query)
+    assert expected <= set(names)
+    assert set(names[:len(expected)]) == expected
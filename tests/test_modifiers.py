@@ -0,0 +1,100 @@
+"""The compiled modifier rule table and the batch history-flag parser."""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import ModifierTable, get_top_diagnoses, load_rules
+from engine.batch import parse_flag, score_encounters
+from engine.modifiers import encounter_context
+
+NAMES = ["Flu", "Heart Attack", "Cold"]
+SEVERITIES = ["Moderate", "EMERGENCY — call 911", "Mild"]
+RULES = [
+    {"when": {"symptom": "Fever", "temperature_min": 103.5}, "diseases": ["Flu"], "weight": 1.25},
+    {"when": {"severity": ["Critical"]}, "severity_contains": "EMERGENCY", "weight": 1.30},
+    {"when": {"age_max": 30}, "diseases": ["Heart Attack"], "weight": 0.75},
+    {"when": {"pmh": "diabetes"}, "diseases": ["Heart Attack", "Cold"], "weight": 1.15},
+]
+
+
+def context(fever, ages, temperatures, severities, diabetes=None):
+    count = len(ages)
+    return encounter_context({"Fever": fever}, ages, ["Male"] * count, temperatures, severities,
+                             ["Intermittent"] * count, ["1-3 days"] * count,
+                             None if diabetes is None else {"diabetes": diabetes})
+
+
+@pytest.mark.parametrize("value, expected", [
+    (True, True), (False, False), (None, False), (float("nan"), False), (1, True), (0, False), (1.0, True),
+    ("yes", True), ("Y", True), (" TRUE ", True), ("1", True),
+    ("no", False), ("n", False), ("False", False), ("0", False), ("", False),
+])
+def test_parse_flag(value, expected):
+    assert parse_flag(value) is expected
+
+
+@pytest.mark.parametrize("value", ["maybe", "2", 2, "on", "t"])
+def test_parse_flag_rejects_other_values(value):
+    with pytest.raises(ValueError):
+        parse_flag(value)
+
+
+def test_score_encounters_names_the_bad_flag_column():
+    frame = pd.DataFrame({"symptoms": ["Fever, Cough"], "pmh_diabetes": ["sometimes"]})
+    with pytest.raises(ValueError, match="pmh_diabetes"):
+        score_encounters(frame)
+
+
+def test_no_flag_scores_like_a_blank_flag():
+    frame = pd.DataFrame({"symptoms": ["Frequent Urination, Increased Thirst, Fatigue"] * 3, "pmh_diabetes": ["no", "", "yes"]})
+    no, blank, yes = [record["confidence"] for record in score_encounters(frame)]
+    assert no == blank
+    assert yes > no
+
+
+def test_table_weights_and_max_modifier():
+    table = ModifierTable(RULES, NAMES, SEVERITIES)
+    np.testing.assert_array_equal(table.weights, [[1.25, 1, 1], [1, 1.30, 1], [1, 0.75, 1], [1, 1.15, 1.15]])
+    np.testing.assert_allclose(table.max_modifier, [1.25, 1.30 * 1.15, 1.15])
+    assert table.symptoms == ["Fever"]
+
+
+def test_fired_and_modifiers():
+    table = ModifierTable(RULES, NAMES, SEVERITIES)
+    fired = table.fired(context([True, True, False], [25, 70, 25], [104.0, 103.4, 104.0],
+                                ["Critical", "Critical", "Mild"], diabetes=[False, True, True]))
+    np.testing.assert_array_equal(fired, [[True, False, False], [True, True, False],
+                                          [True, False, True], [False, True, True]])
+    np.testing.assert_allclose(table.modifiers(fired), [[1.25, 1.30 * 0.75, 1],
+                                                       [1, 1.30 * 1.15, 1.15],
+                                                       [1, 0.75 * 1.15, 1.15]])
+    np.testing.assert_allclose(table.modifiers(fired, [2]), [[1], [1.15], [1.15]])
+
+
+def test_pmh_flag_raises_the_flagged_disease(catalog):
+    args = (["Frequent Urination", "Fatigue", "Blurred Vision"], 50, "Male", 98.6, "Moderate",
+            "Gradual (days-weeks)", "1-3 days")
+    plain = get_top_diagnoses(*args, compiled=catalog.symptom_matrix)
+    flagged = get_top_diagnoses(*args, pmh={"diabetes": True}, compiled=catalog.symptom_matrix)
+    plain_t2dm = next(r for r in plain if r["disease"] == "Type 2 Diabetes Mellitus")
+    flagged_t2dm = next(r for r in flagged if r["disease"] == "Type 2 Diabetes Mellitus")
+    assert flagged_t2dm["modifier"] == pytest.approx(plain_t2dm["modifier"] * 1.30)
+
+
+@pytest.mark.parametrize("rule, message", [
+    ({"when": {"phase_of_moon": "full"}, "diseases": ["Flu"], "weight": 2}, "unknown condition"),
+    ({"when": {"age_min": 60}, "weight": 2}, "needs 'diseases'"),
+    ({"when": {"pmh": "gout"}, "diseases": ["Flu"], "weight": 2}, "unknown pmh flag"),
+])
+def test_load_rules_rejects_bad_rules(tmp_path, rule, message):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"rules": [rule]}))
+    with pytest.raises(ValueError, match=message):
+        load_rules(str(path))
+
+
+def test_bundled_rules_load():
+    assert load_rules()
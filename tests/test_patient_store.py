@@ -0,0 +1,176 @@
+"""PatientStore keyset pagination and trigger-maintained counts."""
+
+import json
+import random
+import sqlite3
+
+import pytest
+
+from engine import PatientStore, patient_store
+
+SEVERITIES = ["Mild", "Moderate", "Severe"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PatientStore(str(tmp_path / "patients.sqlite"))
+    yield store
+    store.close()
+
+
+def add_records(store, patient, count, seed=3):
+    """Records with many shared timestamps and confidences, so pages split ties."""
+    rng = random.Random(seed)
+    records = []
+    for n in range(count):
+        record = {"n": n, "date": f"2024-0{rng.randint(1, 3)}-0{rng.randint(1, 2)} 10:00:00",
+                  "severity": rng.choice(SEVERITIES), "confidence": rng.choice([55, 70, 85])}
+        store.add_consultation(patient, record)
+        records.append(record)
+    return records
+
+
+def expected_order(records, order, severity=None):
+    rows = [r for r in records if severity is None or r["severity"] == severity]
+    if order == "recent":
+        return sorted(rows, key=lambda r: (r["date"], r["n"]), reverse=True)
+    if order == "oldest":
+        return sorted(rows, key=lambda r: (r["date"], r["n"]))
+    return sorted(rows, key=lambda r: (-r["confidence"], r["n"]))
+
+
+def all_pages(store, patient, order, severity, limit):
+    pages, cursor = [], None
+    while True:
+        page, cursor = store.consultation_page(patient, severity, order, after=cursor, limit=limit)
+        pages.append(page)
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("order", ["recent", "oldest", "confidence"])
+@pytest.mark.parametrize("severity", [None, "Moderate"])
+@pytest.mark.parametrize("limit", [1, 4, 10, 100])
+def test_pages_cover_every_record_once_in_order(store, order, severity, limit):
+    records = add_records(store, "p", 37)
+    add_records(store, "other", 5, seed=9)
+    pages = all_pages(store, "p", order, severity, limit)
+    expected = expected_order(records, order, severity)
+    assert [r["n"] for page in pages for r in page] == [r["n"] for r in expected]
+    assert all(len(page) == limit for page in pages[:-1])
+    assert store.consultations("p", severity, order) == expected
+
+
+def test_counts_follow_inserts_and_deletes(store):
+    records = add_records(store, "p", 20)
+    assert store.consultation_count("p") == 20
+    for severity in SEVERITIES:
+        assert store.consultation_count("p", severity) == sum(r["severity"] == severity for r in records)
+    assert store.mean_confidence("p") == pytest.approx(sum(r["confidence"] for r in records) / 20)
+    store.clear_consultations("p")
+    assert store.consultation_count("p") == 0
+    assert store.mean_confidence("p") is None
+    assert store.consultation_page("p") == ([], None)
+
+
+def test_iter_consultations_chunks(store):
+    records = add_records(store, "p", 23)
+    chunks = list(store.iter_consultations("p", chunk_rows=10))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 3]
+    assert [r for chunk in chunks for r in chunk] == expected_order(records, "oldest")
+
+
+def test_medications_are_listed_once(store):
+    assert store.add_medication("p", {"name": "Metformin"})
+    assert not store.add_medication("p", {"name": "Metformin"})
+    assert store.add_medication("p", {"name": "Warfarin"})
+    assert [m["name"] for m in store.medications("p")] == ["Metformin", "Warfarin"]
+    assert store.medications("other") == []
+
+
+# The first on-disk layout: consultations keyed by a text date, no counts table, user_version 0
+V0_SCHEMA = """
+CREATE TABLE consultations (
+    id         INTEGER PRIMARY KEY,
+    patient    TEXT    NOT NULL,
+    date       TEXT    NOT NULL,
+    severity   TEXT    NOT NULL DEFAULT '',
+    confidence REAL    NOT NULL DEFAULT 0,
+    record     TEXT    NOT NULL
+);
+CREATE INDEX consultations_by_date ON consultations (patient, date);
+CREATE INDEX consultations_by_severity ON consultations (patient, severity, date);
+CREATE INDEX consultations_by_confidence ON consultations (patient, confidence DESC);
+CREATE TABLE medications (
+    id INTEGER PRIMARY KEY, patient TEXT NOT NULL, name TEXT NOT NULL, added_date TEXT NOT NULL,
+    entry TEXT NOT NULL, UNIQUE (patient, name)
+);
+"""
+V0_RECORDS = [
+    {"n": 0, "date": "2024-01-02 10:00:00", "severity": "Mild", "confidence": 50},
+    {"n": 1, "date": "2024-03-02 10:00:00", "severity": "Severe", "confidence": 80},
+    {"n": 2, "date": "2023-12-31 09:00:00", "severity": "Mild", "confidence": 60},
+]
+
+
+def v0_database(path):
+    db = sqlite3.connect(path)
+    db.executescript(V0_SCHEMA)
+    for record in V0_RECORDS:
+        db.execute("INSERT INTO consultations (patient, date, severity, confidence, record) VALUES (?, ?, ?, ?, ?)",
+                   ("p", record["date"], record["severity"], record["confidence"], json.dumps(record)))
+    db.execute("INSERT INTO medications (patient, name, added_date, entry) VALUES ('p', 'Metformin', '', ?)",
+               (json.dumps({"name": "Metformin"}),))
+    db.commit()
+    db.close()
+
+
+def test_migrates_text_dates(tmp_path):
+    path = str(tmp_path / "v0.sqlite")
+    v0_database(path)
+    store = PatientStore(path)
+    try:
+        assert [r["n"] for r in store.consultations("p")] == [1, 0, 2]
+        assert [r["n"] for r in store.consultations("p", order="oldest")] == [2, 0, 1]
+        assert store.consultation_count("p") == 3 and store.consultation_count("p", "Mild") == 2
+        assert store.mean_confidence("p") == pytest.approx(190 / 3)
+        assert [m["name"] for m in store.medications("p")] == ["Metformin"]
+        store.add_consultation("p", {"n": 3, "date": "2025-01-01 00:00:00", "severity": "Mild", "confidence": 10})
+        assert store.consultations("p", limit=1)[0]["n"] == 3
+        assert store.consultation_count("p", "Mild") == 3
+    finally:
+        store.close()
+
+    db = sqlite3.connect(path)
+    assert db.execute("PRAGMA user_version").fetchone()[0] == 1
+    assert {row[0] for row in db.execute("SELECT typeof(taken_at) FROM consultations")} == {"integer"}
+    tables = {row[0] for row in db.execute("SELECT name FROM sqlite_master")}
+    assert "consultations_v0" not in tables and "consultations_by_date" not in tables
+    db.close()
+    # Opening again is a no-op
+    PatientStore(path).close()
+
+
+def test_interrupted_migration_leaves_version_0(tmp_path, monkeypatch):
+    path = str(tmp_path / "v0.sqlite")
+    v0_database(path)
+
+    def crash(db):
+        raise RuntimeError("killed mid-migration")
+
+    monkeypatch.setattr(patient_store, "_copy_consultations", crash)
+    with pytest.raises(RuntimeError):
+        PatientStore(path)
+
+    db = sqlite3.connect(path)
+    assert db.execute("PRAGMA user_version").fetchone()[0] == 0
+    assert "date" in [row[1] for row in db.execute("PRAGMA table_info(consultations)")]
+    assert db.execute("SELECT COUNT(*) FROM consultations").fetchone()[0] == len(V0_RECORDS)
+    assert {row[0] for row in db.execute("SELECT name FROM sqlite_master")} >= {
+        "consultations_by_date", "consultations_by_severity", "consultations_by_confidence"}
+    db.close()
+
+    monkeypatch.undo()
+    store = PatientStore(path)
+    assert [r["n"] for r in store.consultations("p")] == [1, 0, 2]
+    store.close()
@@ -0,0 +1,111 @@
+"""get_top_diagnoses and its batch form against the original per-disease scoring loop."""
+
+import random
+
+import pytest
+
+from engine import DiagnosisCache, compute_jaccard_similarity, get_top_diagnoses, get_top_diagnoses_batch
+
+DURATIONS = ["< 24 hours", "1-3 days", "4-7 days", "1-2 weeks", "2-4 weeks", "> 1 month"]
+ONSETS = ["Sudden (minutes-hours)", "Gradual (days-weeks)", "Intermittent"]
+SEVERITIES = ["Mild", "Moderate", "Severe", "Critical"]
+GENDERS = ["Male", "Female", "Other"]
+
+
+def reference_top_diagnoses(diseases, selected_symptoms, age, gender, temperature, severity, onset, duration,
+                            top_n=3):
+    """The scoring loop the app used before the engine was vectorized, modifiers hard-coded."""
+    selected_set = frozenset(selected_symptoms)
+    scores = []
+    for disease_name, disease_data in diseases.items():
+        disease_symptom_set = disease_data.get("symptom_set", frozenset())
+        jaccard = compute_jaccard_similarity(selected_set, disease_symptom_set)
+        modifier = 1.0
+        if "Fever" in selected_symptoms:
+            if temperature >= 103.5 and disease_name in ["Meningitis", "Pneumonia", "Influenza"]:
+                modifier *= 1.25
+            elif temperature < 99.5 and disease_name in ["Meningitis", "Influenza"]:
+                modifier *= 0.75
+        if severity == "Critical" and "EMERGENCY" in disease_data.get("severity", ""):
+            modifier *= 1.30
+        elif severity in ["Mild", "Moderate"] and "EMERGENCY" in disease_data.get("severity", ""):
+            modifier *= 0.55
+        if onset == "Sudden (minutes-hours)" and disease_name in [
+                "Acute Myocardial Infarction", "Meningitis", "Hypertensive Crisis"]:
+            modifier *= 1.20
+        if age >= 60 and disease_name in ["Pneumonia", "Acute Myocardial Infarction", "Type 2 Diabetes Mellitus"]:
+            modifier *= 1.15
+        if age < 30 and disease_name in ["Type 2 Diabetes Mellitus", "Acute Myocardial Infarction"]:
+            modifier *= 0.75
+        if gender == "Female" and disease_name == "Urinary Tract Infection":
+            modifier *= 1.35
+        if gender == "Male" and disease_name == "Acute Myocardial Infarction" and age >= 45:
+            modifier *= 1.15
+        if duration in ["> 1 month", "2-4 weeks"] and disease_name == "Type 2 Diabetes Mellitus":
+            modifier *= 1.20
+        if duration == "< 24 hours" and disease_name == "Acute Myocardial Infarction":
+            modifier *= 1.15
+
+        final_score = min(jaccard * modifier, 1.0)
+        matched = len(selected_set & disease_symptom_set)
+        coverage = matched / len(disease_symptom_set) if disease_symptom_set else 0
+        confidence = max(min(int(45 + (final_score * 35) + (coverage * 20)), 96), 30)
+        if final_score > 0.05:
+            scores.append({"disease": disease_name, "score": final_score, "confidence": confidence,
+                           "jaccard": jaccard, "symptoms_matched": matched,
+                           "total_disease_symptoms": len(disease_symptom_set), "modifier": modifier})
+    scores.sort(key=lambda x: x["score"], reverse=True)
+    return scores[:top_n]
+
+
+def random_encounters(catalog, count, seed=7):
+    rng = random.Random(seed)
+    symptoms = list(catalog.symptom_matrix.vocabulary.names)
+    encounters = []
+    for _ in range(count):
+        encounters.append((rng.sample(symptoms, rng.randint(1, 8)), rng.randint(1, 95), rng.choice(GENDERS),
+                           rng.choice([97.0, 98.6, 99.5, 101.2, 103.5, 104.8]), rng.choice(SEVERITIES),
+                           rng.choice(ONSETS), rng.choice(DURATIONS)))
+    return encounters
+
+
+def assert_same_ranking(results, expected):
+    assert [r["disease"] for r in results] == [e["disease"] for e in expected]
+    for result, reference in zip(results, expected):
+        assert result["score"] == pytest.approx(reference["score"])
+        assert result["jaccard"] == pytest.approx(reference["jaccard"])
+        assert result["modifier"] == pytest.approx(reference["modifier"])
+        for key in ("confidence", "symptoms_matched", "total_disease_symptoms"):
+            assert result[key] == reference[key], key
+
+
+@pytest.mark.parametrize("top_n", [1, 3, 10])
+def test_single_encounters_match_reference(catalog, top_n):
+    for encounter in random_encounters(catalog, 300):
+        results = get_top_diagnoses(*encounter, top_n=top_n, compiled=catalog.symptom_matrix)
+        assert_same_ranking(results, reference_top_diagnoses(catalog.diseases, *encounter, top_n=top_n))
+
+
+def test_batch_matches_single(catalog):
+    encounters = random_encounters(catalog, 400, seed=11)
+    batch = get_top_diagnoses_batch(*zip(*encounters), top_n=5, compiled=catalog.symptom_matrix)
+    assert len(batch) == len(encounters)
+    for encounter, results in zip(encounters, batch):
+        assert_same_ranking(results, reference_top_diagnoses(catalog.diseases, *encounter, top_n=5))
+
+
+def test_unknown_and_empty_symptoms(catalog):
+    assert get_top_diagnoses([], 40, "Male", 98.6, "Moderate", ONSETS[0], DURATIONS[0],
+                             compiled=catalog.symptom_matrix) == []
+    encounter = (["Fever", "Not A Symptom"], 40, "Male", 98.6, "Moderate", ONSETS[0], DURATIONS[0])
+    assert_same_ranking(get_top_diagnoses(*encounter, compiled=catalog.symptom_matrix),
+                        reference_top_diagnoses(catalog.diseases, *encounter))
+
+
+def test_cached_results_are_identical(catalog):
+    cache = DiagnosisCache(16)
+    encounter = (["Fever", "Cough", "Fatigue"], 67, "Female", 103.5, "Severe", ONSETS[0], DURATIONS[1])
+    first = get_top_diagnoses(*encounter, compiled=catalog.symptom_matrix, cache=cache)
+    second = get_top_diagnoses(*encounter, compiled=catalog.symptom_matrix, cache=cache)
+    assert first == second
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,39 @@
+"""TimeSeriesStore writes, window statistics and clearing a subject."""
+
+import numpy as np
+import pytest
+
+from engine import TimeSeriesStore
+from engine.rolling_stats import DAY_SECONDS
+
+
+@pytest.fixture
+def store():
+    store = TimeSeriesStore()
+    yield store
+    store.close()
+
+
+def daily(days, start=0):
+    return np.arange(start, start + days) * DAY_SECONDS, np.arange(days, dtype=float)
+
+
+def test_stats_follow_writes(store):
+    store.add("s", "hr", *daily(10))
+    assert store.stats("s", "hr", 5)["mean"] == pytest.approx(7.0)
+    store.add("s", "hr", np.array([10 * DAY_SECONDS]), [20.0])
+    assert store.stats("s", "hr", 5)["mean"] == pytest.approx((7 + 8 + 9 + 20 + 6) / 5)
+    assert store.span("s", "hr") == (0, 10 * DAY_SECONDS)
+
+
+def test_clear_removes_one_subject(store):
+    store.add("s", "hr", *daily(10))
+    store.add("other", "hr", *daily(3))
+    store.stats("s", "hr", 5)
+    revision = store.revision
+    store.clear("s")
+    assert store.revision > revision
+    assert store.span("s", "hr") is None and store.metrics("s") == {}
+    assert store.metrics("other") == {"hr": 3}
+    store.add("s", "hr", *daily(2, start=100))
+    assert store.stats("s", "hr", 5)["mean"] == pytest.approx(0.5)
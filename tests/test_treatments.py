@@ -0,0 +1,42 @@
+"""treatment_index: treatment lines linked to the formulary drugs they prescribe."""
+
+import pytest
+
+from engine import treatment_index
+from engine.treatments import advises_against
+
+
+def links(catalog, disease):
+    return dict(catalog.treatment_medications[disease])
+
+
+def test_named_drugs_are_linked(catalog):
+    assert links(catalog, "Type 2 Diabetes Mellitus")["Metformin 500–2000mg daily"] == ("Metformin",)
+    assert links(catalog, "Pneumonia")["Amoxicillin 500mg TID"] == ("Amoxicillin",)
+    assert links(catalog, "Deep Vein Thrombosis")["Warfarin (INR 2-3)"] == ("Warfarin",)
+
+
+@pytest.mark.parametrize("disease, line", [
+    ("Gastroenteritis", "Avoid antibiotics unless bacterial cause confirmed"),
+    ("Pneumonia", "IV antibiotics if admitted"),
+    ("Appendicitis", "IV antibiotics pre-operatively"),
+    ("Type 2 Diabetes Mellitus", "Statins for CV protection"),
+])
+def test_class_and_advisory_lines_link_nothing(catalog, disease, line):
+    assert links(catalog, disease)[line] == ()
+
+
+def test_advisory_lines_naming_a_drug_link_nothing(catalog):
+    diseases = {"Test": {"treatment": {"medications": [
+        "Stop Metformin before contrast", "Do not combine with Coumadin", "Don't start Lisinopril in pregnancy",
+        "Discontinue Zoloft if rash", "Lipitor 20mg nightly"]}}}
+    assert treatment_index(diseases, catalog.interactions)["Test"] == [
+        ("Stop Metformin before contrast", ()), ("Do not combine with Coumadin", ()),
+        ("Don't start Lisinopril in pregnancy", ()), ("Discontinue Zoloft if rash", ()),
+        ("Lipitor 20mg nightly", ("Atorvastatin",))]
+
+
+def test_advises_against():
+    assert advises_against("AVOID NSAIDs")
+    assert not advises_against("Amoxicillin 500mg TID")
+    assert not advises_against("Stopgap analgesia")
@@ -0,0 +1,252 @@
+"""
+Vitals shown on the Dashboard and Analytics pages, and their figures, cached
+across reruns and sessions.
+
+Samples live in a shared engine.timeseries store (in memory, or the SQLite
+file named by MEDICARE_VITALS_DB) whose revision is the data version. Both
+pages show MEDICARE_VITALS_SUBJECT when it is set (vitals imported with
+python -m engine.wearable_ingest); otherwise a demo subject is seeded with
+its demo dataset, drawn from its own RandomState (the same values the pages used to draw from the reseeded global
+generator). The demo datasets end at the time they are seeded, so they are
+re-seeded on the first rerun of every calendar day and the "last N days"
+views keep ending today on a long-running server. Windows, summaries and figures are memoized per (metrics, window,
+data version) and only rebuilt when one of those changes, so widget changes
+and page switches reuse them. Every trace is downsampled to at most
+MAX_POINTS, so a five-year window sends the browser about as much as 90 days.
+Summary cards and tables read the store's incremental window statistics, so
+they cost the same whatever the length of the history.
+Cached figures are shared: never mutate one after it is returned.
+"""
+
+import os
+from datetime import date, datetime
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+from plotly.subplots import make_subplots
+
+from engine.rolling_stats import DAY_SECONDS
+from engine.timeseries import MAX_POINTS, TimeSeriesStore, downsample
+
+VITALS_DB_PATH = os.environ.get("MEDICARE_VITALS_DB", ":memory:")
+
+DAYS = 90
+DASHBOARD_SEED = 42
+ANALYTICS_SEED = 99
+
+# Imported vitals to show instead of the demo data
+VITALS_SUBJECT = os.environ.get("MEDICARE_VITALS_SUBJECT")
+DASHBOARD_SUBJECT = VITALS_SUBJECT or "demo:dashboard"
+ANALYTICS_SUBJECT = VITALS_SUBJECT or "demo:analytics"
+# Analytics page windows, in days up to and including the latest sample's day
+WINDOWS = {"90 days": 90, "1 year": 365, "5 years": 1826}
+
+DASHBOARD_METRICS = ("BP_Systolic", "BP_Diastolic", "Heart_Rate", "Weight", "Sleep_Hours")
+ANALYTICS_METRICS = {
+    'Weight': 'Body Weight (kg)', 'BP_Systolic': 'Systolic BP (mmHg)',
+    'Heart_Rate': 'Heart Rate (bpm)', 'Steps': 'Daily Steps',
+    'Sleep_Hours': 'Sleep Duration (hrs)', 'SpO2': 'SpO2 (%)',
+    'Water_L': 'Water Intake (L)', 'Exercise_Min': 'Exercise (min)'
+}
+TREND_COLORS = {
+    'Weight':       ('#f5a623', 'rgba(245,166,35,0.08)'),
+    'BP_Systolic':  ('#ff5e5b', 'rgba(255,94,91,0.08)'),
+    'Heart_Rate':   ('#00d4aa', 'rgba(0,212,170,0.08)'),
+    'Steps':        ('#4f8ef7', 'rgba(79,142,247,0.08)'),
+    'Sleep_Hours':  ('#9b8bf4', 'rgba(155,139,244,0.08)'),
+    'SpO2':         ('#00d4aa', 'rgba(0,212,170,0.08)'),
+    'Water_L':      ('#4f8ef7', 'rgba(79,142,247,0.08)'),
+    'Exercise_Min': ('#f5a623', 'rgba(245,166,35,0.08)'),
+}
+
+
+# ==================== DEMO DATA ====================
+
+def demo_dashboard_vitals() -> pd.DataFrame:
+    """90 days of blood pressure, heart rate, weight and sleep for the Dashboard demo."""
+    rng = np.random.RandomState(DASHBOARD_SEED)
+    return pd.DataFrame({
+        'Date': pd.date_range(end=datetime.now(), periods=DAYS, freq='D'),
+        'BP_Systolic': np.clip(120 + np.cumsum(rng.randn(DAYS) * 0.5), 110, 140),
+        'BP_Diastolic': np.clip(80 + np.cumsum(rng.randn(DAYS) * 0.3), 70, 90),
+        'Heart_Rate': np.clip(72 + rng.randn(DAYS) * 5, 60, 100),
+        'Weight': 70 + np.cumsum(rng.randn(DAYS) * 0.1),
+        'Sleep_Hours': np.clip(7 + rng.randn(DAYS) * 0.8, 5, 9),
+    })
+
+
+def demo_analytics_vitals() -> pd.DataFrame:
+    """90 days of the Analytics page metrics for the demo."""
+    rng = np.random.RandomState(ANALYTICS_SEED)
+    return pd.DataFrame({
+        'Date': pd.date_range(end=datetime.now(), periods=DAYS, freq='D'),
+        'Weight': 70 + np.cumsum(rng.randn(DAYS) * 0.1),
+        'BP_Systolic': np.clip(120 + np.cumsum(rng.randn(DAYS) * 0.5), 108, 148),
+        'BP_Diastolic': np.clip(80 + np.cumsum(rng.randn(DAYS) * 0.3), 68, 98),
+        'Heart_Rate': np.clip(72 + rng.randn(DAYS) * 5, 58, 102),
+        'Steps': rng.randint(4500, 15000, DAYS),
+        'Sleep_Hours': np.clip(7 + rng.randn(DAYS) * 0.8, 4.5, 9.5),
+        'SpO2': np.clip(98 + rng.randn(DAYS) * 0.5, 94, 100),
+        'Water_L': np.clip(2.0 + rng.randn(DAYS) * 0.3, 0.8, 3.5),
+        'Exercise_Min': rng.randint(0, 95, DAYS)
+    })
+
+
+# ==================== DATASETS ====================
+
+@st.cache_resource(show_spinner=False)
+def _open_store() -> TimeSeriesStore:
+    return TimeSeriesStore(VITALS_DB_PATH)
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _seeded_store(day: date) -> TimeSeriesStore:
+    """The process-wide store with the demo subjects' datasets replaced by ones ending now (once per `day`)."""
+    store = _open_store()
+    for subject, demo in ((DASHBOARD_SUBJECT, demo_dashboard_vitals), (ANALYTICS_SUBJECT, demo_analytics_vitals)):
+        if subject.startswith("demo:"):
+            store.clear(subject)
+            data = demo()
+            for metric in data.columns.drop('Date'):
+                store.add(subject, metric, data['Date'].to_numpy(), data[metric].to_numpy())
+    return store
+
+
+def vitals_store() -> TimeSeriesStore:
+    """Process-wide vitals store; demo subjects hold their demo dataset, ending today."""
+    return _seeded_store(date.today())
+
+
+def data_version() -> int:
+    """Version of the vitals data; windows and figures are rebuilt when it changes."""
+    return vitals_store().revision
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def window(subject: str, metrics: Sequence[str], days: int, version: int) -> Dict[str, pd.Series]:
+    """
+    {metric: series} over the `days` days up to each metric's latest sample, at the
+    finest resolution the store serves for that span (not downsampled).
+    """
+    store = vitals_store()
+    data = {}
+    for metric in metrics:
+        span = store.span(subject, metric)
+        if span is None:
+            data[metric] = pd.Series(dtype=float, name=metric)
+            continue
+        last_day = span[1] - span[1] % DAY_SECONDS
+        times, values = store.window(subject, metric, last_day - (days - 1) * DAY_SECONDS, span[1])
+        data[metric] = pd.Series(values, index=pd.DatetimeIndex(times, name='Date'), name=metric)
+    return data
+
+
+def metric_stats(subject: str, metric: str, days: int = DAYS) -> Dict[str, float]:
+    """Current value, count, mean, std, min, max and first/last-week means over `days` days."""
+    return vitals_store().stats(subject, metric, days)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def analytics_summary(days: int, version: int) -> pd.DataFrame:
+    """Mean, spread, range and weekly trend of every Analytics metric."""
+    rows = []
+    for col_name, label in ANALYTICS_METRICS.items():
+        d = metric_stats(ANALYTICS_SUBJECT, col_name, days)
+        rows.append({"Metric": label, "Mean": round(d["mean"], 1), "Std Dev": round(d["std"], 1),
+                     "Min": round(d["min"], 1), "Max": round(d["max"], 1),
+                     "Trend": "↗" if d["last_mean"] > d["first_mean"] else "↘"})
+    return pd.DataFrame(rows)
+
+
+# ==================== FIGURES ====================
+
+def _trace(series: pd.Series, method: str = "lttb"):
+    """(x, y) of a series reduced to at most MAX_POINTS points."""
+    return downsample(series.index.to_numpy(), series.to_numpy(), MAX_POINTS, method)
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def dashboard_figure(metrics: Sequence[str], days: int, version: int) -> go.Figure:
+    """The 2×2 Dashboard vitals grid (blood pressure, heart rate, weight, sleep)."""
+    health_data = window(DASHBOARD_SUBJECT, metrics, days, version)
+    fig = make_subplots(rows=2, cols=2,
+                        subplot_titles=(
+                            'Blood Pressure', 'Heart Rate', 'Body Weight', 'Sleep Quality'),
+                        vertical_spacing=0.14, horizontal_spacing=0.1)
+
+    colors = {'systolic': '#ff5e5b', 'diastolic': '#4f8ef7',
+              'hr': '#00d4aa', 'weight': '#f5a623', 'sleep': '#9b8bf4'}
+
+    if 'BP_Systolic' in metrics:
+        x, y = _trace(health_data['BP_Systolic'])
+        fig.add_trace(go.Scatter(x=x, y=y,
+                                 name='Systolic', line=dict(color=colors['systolic'], width=2.5)), row=1, col=1)
+    if 'BP_Diastolic' in metrics:
+        x, y = _trace(health_data['BP_Diastolic'])
+        fig.add_trace(go.Scatter(x=x, y=y,
+                                 name='Diastolic', line=dict(color=colors['diastolic'], width=2.5),
+                                 fill='tonexty', fillcolor='rgba(79,142,247,0.06)'), row=1, col=1)
+    if 'Heart_Rate' in metrics:
+        x, y = _trace(health_data['Heart_Rate'])
+        fig.add_trace(go.Scatter(x=x, y=y,
+                                 name='HR', line=dict(color=colors['hr'], width=2.5),
+                                 fill='tozeroy', fillcolor='rgba(0,212,170,0.08)'), row=1, col=2)
+    if 'Weight' in metrics:
+        x, y = _trace(health_data['Weight'])
+        fig.add_trace(go.Scatter(x=x, y=y,
+                                 name='Weight', line=dict(color=colors['weight'], width=2.5),
+                                 mode='lines+markers', marker=dict(size=3)), row=2, col=1)
+    if 'Sleep_Hours' in metrics:
+        # Bars keep each bucket's shortest and longest night rather than LTTB's shape points
+        x, y = _trace(health_data['Sleep_Hours'], "minmax")
+        fig.add_trace(go.Bar(x=x, y=y,
+                             name='Sleep', marker=dict(color=colors['sleep'], opacity=0.7)), row=2, col=2)
+
+    fig.update_layout(
+        height=520, showlegend=False, hovermode='x unified',
+        margin=dict(l=10, r=10, t=40, b=10),
+        plot_bgcolor='rgba(26,31,46,0.5)', paper_bgcolor='rgba(26,31,46,0)',
+        font=dict(color='#8892a4', size=11),
+    )
+    for annotation in fig.layout.annotations:
+        annotation.font.color = '#8892a4'
+        annotation.font.size = 12
+    fig.update_xaxes(showgrid=True, gridwidth=1,
+                     gridcolor='rgba(255,255,255,0.04)', color='#8892a4')
+    fig.update_yaxes(showgrid=True, gridwidth=1,
+                     gridcolor='rgba(255,255,255,0.04)', color='#8892a4')
+    return fig
+
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def trend_figure(metric: str, days: int, version: int) -> go.Figure:
+    """One Analytics metric with its 7-day moving average."""
+    series = window(ANALYTICS_SUBJECT, (metric,), days, version)[metric]
+    # Time-based, so it stays a 7-day average when the window comes from hourly or daily rollups
+    average = series.rolling('7D', min_periods=7).mean() if len(series) else series
+    c, c_fill = TREND_COLORS.get(metric, ('#00d4aa', 'rgba(0,212,170,0.08)'))
+
+    fig = go.Figure()
+    x, y = _trace(series)
+    fig.add_trace(go.Scatter(x=x, y=y,
+                             mode='lines', name=ANALYTICS_METRICS[metric], line=dict(color=c, width=2),
+                             fill='tozeroy', fillcolor=c_fill, opacity=0.9))
+    x, y = _trace(average)
+    fig.add_trace(go.Scatter(x=x, y=y,
+                             mode='lines', name='7-Day MA', line=dict(color='#f0f4f8', width=2, dash='dash')))
+
+    fig.update_layout(
+        height=420, hovermode='x unified', showlegend=True,
+        plot_bgcolor='rgba(26,31,46,0.5)', paper_bgcolor='rgba(26,31,46,0)',
+        font=dict(color='#8892a4'), margin=dict(l=10, r=10, t=20, b=10),
+        legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1,
+                    font=dict(color='#f0f4f8'))
+    )
+    fig.update_xaxes(
+        showgrid=True, gridcolor='rgba(255,255,255,0.04)', color='#8892a4')
+    fig.update_yaxes(
+        showgrid=True, gridcolor='rgba(255,255,255,0.04)', color='#8892a4')
+    return fig